@@ -1,3 +1,8 @@
+import logging
 from .fairness import simmilarity_fairness_hash
 from .fairness import fairness_metrics_table
 from .dataviz import similar_subjects_treatment_plot
+from .instrumentation import Profile
+
+# library logging is silent unless the application configures it
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -0,0 +1,222 @@
+import numpy as np
+from kafkanator.inequality import _xlogx, weighted_gini, theil_group_statistics, theil_decomposition_from_statistics
+
+def _chunk_values(chunk):
+    """This PRIVATE method turns a chunk (list, numpy array, pandas Series) into a float64 array without null values."""
+    x = np.asarray(chunk, dtype=np.float64).ravel()
+    return x[~np.isnan(x)]
+
+class MeanAccumulator:
+    """Mergeable mean of a stream of incomes.
+
+    Examples:
+        >>> acc = MeanAccumulator()
+        >>> for chunk in pd.read_csv('salaries.csv', chunksize=100000):
+        ...     acc.update(chunk['salary'])
+        >>> acc.result()
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+
+    def update(self, chunk):
+        """Adds a chunk of incomes (list, numpy array or pandas Series), null values are ignored. Returns self."""
+        x = _chunk_values(chunk)
+        self.n += len(x)
+        self.total += np.sum(x)
+        return self
+
+    def merge(self, other):
+        """Adds the partial result of another accumulator of the same type, for example computed by another worker. Returns self."""
+        self.n += other.n
+        self.total += other.total
+        return self
+
+    def result(self):
+        return self.total / self.n if self.n > 0 else np.nan
+
+class TheilTAccumulator(MeanAccumulator):
+    """Mergeable Theil T index, exact: it only needs n, sum(x) and sum(x log x).
+
+    Args:
+        base_entropy (float): the base to compute the entropy, as on theil_index_T(..).
+    """
+
+    def __init__(self, base_entropy=np.e):
+        MeanAccumulator.__init__(self)
+        self.base_entropy = base_entropy
+        self.xlogx = 0.0
+
+    def update(self, chunk):
+        x = _chunk_values(chunk)
+        self.n += len(x)
+        self.total += np.sum(x)
+        self.xlogx += np.sum(_xlogx(x))
+        return self
+
+    def merge(self, other):
+        MeanAccumulator.merge(self, other)
+        self.xlogx += other.xlogx
+        return self
+
+    def result(self):
+        if self.n == 0:
+            return np.nan
+        entropy = np.log(self.total) - self.xlogx / self.total
+        return np.log(self.n) - entropy / np.log(self.base_entropy)
+
+class TheilLAccumulator(MeanAccumulator):
+    """Mergeable Theil L index, exact: it only needs n, sum(x) and sum(log x)."""
+
+    def __init__(self):
+        MeanAccumulator.__init__(self)
+        self.log_total = 0.0
+
+    def update(self, chunk):
+        x = _chunk_values(chunk)
+        self.n += len(x)
+        self.total += np.sum(x)
+        with np.errstate(divide='ignore'):
+            self.log_total += np.sum(np.log(x))
+        return self
+
+    def merge(self, other):
+        MeanAccumulator.merge(self, other)
+        self.log_total += other.log_total
+        return self
+
+    def result(self):
+        if self.n == 0:
+            return np.nan
+        return np.log(self.total / self.n) - self.log_total / self.n
+
+class HistogramAccumulator:
+    """Mergeable histogram of a stream of incomes: sorted distinct values (or bins), with their population and income sum.
+
+    Indexes that depend on the whole distribution (gini, robin hood) are computed from it. With bin_width=None every distinct
+    value is its own bin, so the result is exact and memory grows with the number of distinct incomes (salaries, rounded
+    amounts). With a bin_width incomes are bucketed into [k*bin_width, (k+1)*bin_width) and each bin is summarised by its
+    mean income, which bounds memory and gives an approximate index, the mean itself stays exact.
+
+    Args:
+        bin_width (float, optional): width of the income bins, None for exact distinct values.
+    """
+
+    def __init__(self, bin_width=None):
+        self.bin_width = bin_width
+        self.bins = np.empty(0, dtype=np.float64)
+        self.population = np.empty(0, dtype=np.int64)
+        self.income = np.empty(0, dtype=np.float64)
+
+    def _add(self, bins, population, income):
+        bins = np.concatenate((self.bins, bins))
+        unique_bins, inverse = np.unique(bins, return_inverse=True)
+        self.population = np.bincount(inverse, weights=np.concatenate((self.population, population)), minlength=len(unique_bins)).astype(np.int64)
+        self.income = np.bincount(inverse, weights=np.concatenate((self.income, income)), minlength=len(unique_bins))
+        self.bins = unique_bins
+
+    def update(self, chunk):
+        """Adds a chunk of incomes (list, numpy array or pandas Series), null values are ignored. Returns self."""
+        x = _chunk_values(chunk)
+        keys = x if self.bin_width is None else np.floor(x / self.bin_width)
+        bins, inverse, population = np.unique(keys, return_inverse=True, return_counts=True)
+        self._add(bins, population, np.bincount(inverse, weights=x, minlength=len(bins)))
+        return self
+
+    def merge(self, other):
+        """Adds the histogram of another accumulator with the same bin_width. Returns self."""
+        if other.bin_width != self.bin_width:
+            raise ValueError('cannot merge histograms with different bin widths')
+        self._add(other.bins, other.population, other.income)
+        return self
+
+    def values(self):
+        """Returns (income, population): the mean income of every bin and its population, ascending."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.income / self.population, self.population
+
+class GiniAccumulator(HistogramAccumulator):
+    """Mergeable gini index, exact with bin_width=None and approximate (within bin differences are ignored) otherwise."""
+
+    def result(self):
+        if len(self.bins) == 0:
+            return np.nan
+        (income, population) = self.values()
+        return weighted_gini(income, population)
+
+class RobinHoodAccumulator(HistogramAccumulator):
+    """Mergeable robin hood index, exact with bin_width=None and approximate for bins straddling the mean otherwise."""
+
+    def result(self):
+        if len(self.bins) == 0:
+            return np.nan
+        (income, population) = self.values()
+        total = np.sum(self.income)
+        egal_income = total / np.sum(population)
+        above = income > egal_income
+        return np.sum(population[above] * (income[above] - egal_income)) / total
+
+class TheilDecompositionAccumulator:
+    """Mergeable between / within group decomposition of the Theil T and Theil L indexes, exact: every group only needs
+    n, sum(x), sum(x log x) and sum(log x), see theil_group_statistics(..).
+
+    Examples:
+        >>> acc = TheilDecompositionAccumulator()
+        >>> for chunk in pd.read_csv('salaries.csv', chunksize=10**6):
+        ...     acc.update(chunk['region'], chunk['salary'])
+        >>> (summary, groups) = acc.result()
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.statistics = np.zeros((0, 4), dtype=np.float64)
+
+    def _add(self, keys, statistics):
+        position = {k: p for (p, k) in enumerate(self.keys)}
+        new_keys = [k for k in keys if k not in position]
+        for k in new_keys:
+            position[k] = len(position)
+        self.keys = self.keys + new_keys
+        grown = np.zeros((len(self.keys), 4), dtype=np.float64)
+        grown[:len(self.statistics)] = self.statistics
+        grown[[position[k] for k in keys]] += statistics
+        self.statistics = grown
+
+    def update(self, groups, chunk):
+        """Adds a chunk of incomes with the group of every income, null groups and incomes are ignored. Returns self."""
+        self._add(*theil_group_statistics(groups, chunk))
+        return self
+
+    def merge(self, other):
+        """Adds the statistics of another TheilDecompositionAccumulator, its groups may differ. Returns self."""
+        self._add(other.keys, other.statistics)
+        return self
+
+    def result(self):
+        """Returns (summary, groups), see theil_decomposition_from_statistics(..), groups sorted by key when keys are comparable."""
+        order = list(range(len(self.keys)))
+        try:
+            order.sort(key=lambda p: self.keys[p])
+        except TypeError:
+            pass
+        return theil_decomposition_from_statistics([self.keys[p] for p in order], self.statistics[order])
+
+def accumulate_column(chunks, column, *accumulators):
+    """Feeds every chunk of a chunked reader, for example pd.read_csv(path, chunksize=..), to one or more accumulators.
+
+    Examples:
+        >>> (gini, theil) = accumulate_column(pd.read_csv('payroll.csv', chunksize=10**6), 'salary', GiniAccumulator(), TheilTAccumulator())
+
+    Args:
+        chunks (iterable): iterable of pandas DataFrames.
+        column (str): the income column.
+        accumulators: the accumulators to update.
+
+    Returns:
+        list: the result() of every accumulator, in the same order.
+    """
+    for chunk in chunks:
+        for acc in accumulators:
+            acc.update(chunk[column])
+    return [acc.result() for acc in accumulators]
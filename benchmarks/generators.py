@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+RACES = ['African-American', 'Asian', 'Caucasian', 'Hispanic', 'Other']
+
+def incomes(n, seed=0):
+    """Returns n positive integer incomes drawn from a log-normal distribution, a usual model of salaries."""
+    rng = np.random.default_rng(seed)
+    return np.round(rng.lognormal(mean=10, sigma=0.75, size=n)).astype(np.int64) + 1
+
+def income_buckets(n, seed=0):
+    """Returns (population, income): n income buckets and the number of people earning each one, as lorentz_curve(..) takes them."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(1, 1000, size=n), incomes(n, seed + 1)
+
+def grouped_incomes(n, n_groups=None, seed=0):
+    """Returns a DataFrame of n rows with a categorical 'region' column and an 'income' column.
+
+    Args:
+        n (int): number of rows.
+        n_groups (int, optional): number of regions, by default one region per 100 rows (between 1 and 1000).
+        seed (int): random seed.
+    """
+    n_groups = max(1, min(1000, n // 100)) if n_groups is None else n_groups
+    rng = np.random.default_rng(seed)
+    # skewed group sizes, a few big regions and many small ones
+    codes = np.minimum((rng.pareto(1.5, size=n) * n_groups / 10).astype(np.int64), n_groups - 1)
+    regions = pd.Categorical.from_codes(codes, categories=['region-%04d' % g for g in range(n_groups)])
+    return pd.DataFrame({'region': regions, 'income': incomes(n, seed + 1)})
+
+def fairness_table(n, seed=0):
+    """Returns a DataFrame of n individuals with 'sex' and 'race' sensitive columns and binary 'prediction' and 'reality' columns.
+
+    Positive rates depend on the sensitive columns, so the fairness metrics are not trivially equal across groups.
+    """
+    rng = np.random.default_rng(seed)
+    sex = rng.integers(0, 2, size=n)
+    race = rng.choice(len(RACES), size=n, p=[0.35, 0.05, 0.4, 0.15, 0.05])
+    reality = (rng.random(n) < 0.3 + 0.05 * sex).astype(np.int64)
+    score = 0.6 * reality + 0.25 * rng.random(n) + 0.03 * race
+    return pd.DataFrame({'sex': pd.Categorical.from_codes(sex, categories=['Female', 'Male']),
+                         'race': pd.Categorical.from_codes(race, categories=RACES),
+                         'prediction': (score > 0.5).astype(np.int64),
+                         'reality': reality})
+
+def simmilarity_table(n, seed=0):
+    """Returns a DataFrame of n individuals with the columns of the simmilarity fairness examples: sex, race, age, priors_count and score."""
+    rng = np.random.default_rng(seed)
+    table = fairness_table(n, seed)
+    return pd.DataFrame({'sex': table['sex'].astype(str), 'race': table['race'].astype(str),
+                         'age': rng.integers(18, 80, size=n), 'priors_count': rng.poisson(2, size=n),
+                         'score': table['prediction']})
+
+SIMMILARITY_ATTRIBUTES = {'race': 'cat', 'age': 'num', 'priors_count': 'num', 'score': 'target'}
+
+def ages(n, seed=0, missing=0.01):
+    """Returns a DataFrame with an 'age' column of n ages, a share missing of them null and a few out of every age band."""
+    rng = np.random.default_rng(seed)
+    age = rng.uniform(15, 85, size=n)
+    age[rng.random(n) < missing] = np.nan
+    return pd.DataFrame({'age': age})
+
+AGE_BANDS = {'young': (18, 30), 'adult': (31, 50), 'senior': (51, 65), 'elder': (66, 80)}
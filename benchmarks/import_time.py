@@ -0,0 +1,81 @@
+"""Measures the cold import time of kafkanator, every run in a fresh interpreter.
+
+Examples:
+    $ python benchmarks/import_time.py --repeat 10 --budget 1.5
+    $ python benchmarks/import_time.py --module kafkanator.inequality
+
+The script exits with status 1 when the median import time exceeds --budget or when a heavy optional dependency
+(plotting, machine learning, scipy) is loaded by the import, so it can guard container cold starts on CI.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# dependencies that must only load when a function needing them is called
+HEAVY_MODULES = ('matplotlib', 'plotly', 'sklearn', 'scipy')
+
+_PROBE = """
+import sys, time, json
+before = len(sys.modules)
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+report = {{'seconds': elapsed, 'modules': len(sys.modules) - before, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}
+{then}
+report['loaded_after'] = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps(report))
+"""
+
+def package_parent():
+    """Returns the directory to put on PYTHONPATH so that 'import kafkanator' finds the package this script belongs to."""
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if os.path.basename(here) == 'kafkanator':
+        return os.path.dirname(here)
+    import kafkanator
+    return os.path.dirname(os.path.dirname(os.path.abspath(kafkanator.__file__)))
+
+def measure_import(module='kafkanator', path=None, heavy=HEAVY_MODULES, then=''):
+    """Imports module in a new python process.
+
+    Args:
+        module (str): the module to import.
+        path (str, optional): directory prepended to PYTHONPATH, package_parent() by default.
+        heavy (tuple): top level modules whose presence in sys.modules is reported.
+        then (str): python statement run after the import, to check what a first call loads.
+
+    Returns:
+        dict: 'seconds' the import time, 'modules' the number of modules the import loaded, 'loaded' the heavy modules
+        present after the import and 'loaded_after' those present after then.
+    """
+    env = dict(os.environ)
+    path = package_parent() if path is None else path
+    env['PYTHONPATH'] = path + os.pathsep + env.get('PYTHONPATH', '')
+    # run outside the package directory, its kafkanator.py module would shadow the package
+    out = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=tuple(heavy), then=then)],
+                         env=env, cwd=path, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='kafkanator')
+    parser.add_argument('--path', default=None, help='directory containing the kafkanator package, found automatically by default')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=None, help='maximum median import time in seconds')
+    args = parser.parse_args(argv)
+    runs = [measure_import(args.module, args.path) for _ in range(args.repeat)]
+    times = sorted(r['seconds'] for r in runs)
+    loaded = sorted(set(m for r in runs for m in r['loaded']))
+    median = times[len(times) // 2]
+    print(json.dumps({'module': args.module, 'min': times[0], 'median': median, 'max': times[-1], 'heavy_loaded': loaded}, indent=2))
+    if len(loaded) > 0:
+        print('heavy modules loaded at import: ' + ', '.join(loaded), file=sys.stderr)
+        return 1
+    if args.budget is not None and median > args.budget:
+        print('median import time %.3fs exceeds the %.3fs budget' % (median, args.budget), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
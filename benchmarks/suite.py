@@ -0,0 +1,195 @@
+"""Offline benchmark suite of the kafkanator hot paths, with scaling curves and baseline comparison.
+
+Examples:
+    $ python -m kafkanator.benchmarks.suite --max-size 1000000 --save results.json
+    $ python -m kafkanator.benchmarks.suite --compare kafkanator/benchmarks/baseline.json
+    $ python -m kafkanator.benchmarks.suite --only gini,lorentz_curve --max-size 10000000
+
+Every benchmark runs on synthetic data (see generators.py) for sizes 10^2, 10^3, ... up to min(--max-size, its own cap),
+quadratic algorithms have a lower cap. Data generation is excluded from the measures, the best wall time of at least
+--repeat runs (more for fast functions, up to --min-time seconds) is recorded along with the peak memory traced by
+tracemalloc during one extra run. With --compare the process exits with status 1 when a benchmark is slower or uses
+more memory than the baseline beyond the tolerances.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from kafkanator.inequality import gini, lorentz_curve, index_per_cluster
+from kafkanator.fairness.metrics import fairness_metrics_table
+from kafkanator.fairness.simmilarity import simmilarity_fairness_hash
+from kafkanator.util import categorize_interval
+from kafkanator.benchmarks import generators
+
+SIZES = [10 ** e for e in range(2, 8)]
+# name -> (setup, max_size), setup(n) builds the data and returns the function to measure
+BENCHMARKS = {}
+
+def benchmark(name, max_size=10 ** 7):
+    """Decorator registering a setup function under name, the benchmark is not run above max_size rows."""
+    def register(setup):
+        BENCHMARKS[name] = (setup, max_size)
+        return setup
+    return register
+
+@benchmark('gini')
+def _gini(n):
+    x = generators.incomes(n)
+    return lambda: gini(x)
+
+@benchmark('lorentz_curve')
+def _lorentz_curve(n):
+    (population, income) = generators.income_buckets(n)
+    return lambda: lorentz_curve(population, income, gini_index=True)
+
+@benchmark('index_per_cluster')
+def _index_per_cluster(n):
+    df = generators.grouped_incomes(n)
+    return lambda: index_per_cluster(df, 'region', 'income', index='gini')
+
+@benchmark('fairness_metrics_table')
+def _fairness_metrics_table(n):
+    df = generators.fairness_table(n)
+    return lambda: fairness_metrics_table(df, ['race'], 'prediction', 'reality', aggregate_metrics=True)
+
+# every pair of the two groups is returned, memory grows with n^2
+@benchmark('simmilarity_fairness_hash', max_size=10 ** 3)
+def _simmilarity_fairness_hash(n):
+    df = generators.simmilarity_table(n)
+    return lambda: simmilarity_fairness_hash(df, 'sex', ['Female', 'Male'], generators.SIMMILARITY_ATTRIBUTES)
+
+@benchmark('categorize_interval')
+def _categorize_interval(n):
+    df = generators.ages(n)
+    return lambda: categorize_interval(df, 'age', generators.AGE_BANDS)
+
+def measure(function, repeat=5, min_time=0.2, max_runs=1000):
+    """Measures a function without arguments.
+
+    Args:
+        function (callable): the function to measure.
+        repeat (int): minimum number of timed runs.
+        min_time (float): fast functions are run again until the timed runs last min_time seconds in total.
+        max_runs (int): maximum number of timed runs.
+
+    Returns:
+        dict: 'seconds' the best wall time, 'runs' the number of timed runs and 'peak_bytes' the peak memory allocated
+        during one traced run.
+    """
+    times = []
+    while len(times) < max(1, repeat) or (sum(times) < min_time and len(times) < max_runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(times), 'runs': len(times), 'peak_bytes': peak}
+
+def run(names=None, max_size=10 ** 6, repeat=5, min_time=0.2, sizes=SIZES, report=None):
+    """Runs the benchmarks.
+
+    Args:
+        names (list, optional): benchmarks to run, every registered one by default.
+        max_size (int): largest size to run.
+        repeat (int): see measure(..).
+        min_time (float): see measure(..).
+        sizes (list): candidate sizes.
+        report (callable, optional): called with every result as soon as it is measured, for progress output.
+
+    Returns:
+        list: one dict per (benchmark, size) with the keys benchmark, size, seconds, runs and peak_bytes.
+    """
+    names = list(BENCHMARKS) if names is None else list(names)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if len(unknown) > 0:
+        raise ValueError('unknown benchmarks ' + ', '.join(unknown))
+    results = []
+    for name in names:
+        (setup, cap) = BENCHMARKS[name]
+        for n in sizes:
+            if n > min(max_size, cap):
+                continue
+            result = {'benchmark': name, 'size': n}
+            result.update(measure(setup(n), repeat, min_time))
+            results.append(result)
+            if report is not None:
+                report(result)
+    return results
+
+def environment():
+    """Describes the machine and library versions, stored with the results because timings only compare on the same setup."""
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'system': platform.system(), 'processor': platform.processor()}
+
+def compare(results, baseline, time_tolerance=0.25, memory_tolerance=0.10, min_seconds=1e-3, min_bytes=2 ** 16):
+    """Compares results with baseline results of the same benchmarks and sizes.
+
+    Args:
+        results (list): results of run(..).
+        baseline (list): stored results of run(..), entries without a counterpart are ignored.
+        time_tolerance (float): accepted relative slowdown.
+        memory_tolerance (float): accepted relative growth of the peak memory.
+        min_seconds (float): absolute slowdown under which timings are considered noise.
+        min_bytes (int): absolute memory growth under which peak memories are considered noise (lazy caches of the libraries).
+
+    Returns:
+        DataFrame: one row per compared (benchmark, size) with the time and memory ratios and a 'regression' flag.
+    """
+    reference = {(b['benchmark'], b['size']): b for b in baseline}
+    rows = []
+    for r in results:
+        b = reference.get((r['benchmark'], r['size']))
+        if b is None:
+            continue
+        slower = r['seconds'] > b['seconds'] * (1 + time_tolerance) and r['seconds'] - b['seconds'] > min_seconds
+        bigger = r['peak_bytes'] > b['peak_bytes'] * (1 + memory_tolerance) and r['peak_bytes'] - b['peak_bytes'] > min_bytes
+        rows.append({'benchmark': r['benchmark'], 'size': r['size'],
+                     'time_ratio': r['seconds'] / b['seconds'] if b['seconds'] > 0 else np.inf,
+                     'memory_ratio': r['peak_bytes'] / b['peak_bytes'] if b['peak_bytes'] > 0 else np.inf,
+                     'regression': bool(slower or bigger)})
+    return pd.DataFrame(rows, columns=['benchmark', 'size', 'time_ratio', 'memory_ratio', 'regression'])
+
+def save(path, results):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=1)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', default=None, help='comma separated benchmark names, among ' + ', '.join(BENCHMARKS))
+    parser.add_argument('--max-size', type=int, default=10 ** 6)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument('--save', default=None, help='json file to write the results to')
+    parser.add_argument('--compare', default=None, help='baseline json file written by --save')
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.10)
+    args = parser.parse_args(argv)
+    names = args.only.split(',') if args.only is not None else None
+    report = lambda r: print('%-28s %10d %12.6fs %14d B' % (r['benchmark'], r['size'], r['seconds'], r['peak_bytes']), flush=True)
+    results = run(names, args.max_size, args.repeat, args.min_time, report=report)
+    if args.save is not None:
+        save(args.save, results)
+    if args.compare is not None:
+        baseline = load(args.compare)
+        if baseline['environment'] != environment():
+            print('warning: the baseline was recorded on another environment ' + json.dumps(baseline['environment']), file=sys.stderr)
+        comparison = compare(results, baseline['results'], args.time_tolerance, args.memory_tolerance)
+        print(comparison.to_string(index=False))
+        if comparison['regression'].any():
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import os
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+def _library(data):
+    """This PRIVATE method returns the top level package defining the type of data, 'pyarrow' or 'polars' for example."""
+    return type(data).__module__.split('.')[0]
+
+def is_parquet_path(data):
+    """True if data is the path (str or path like) of a parquet file or of a directory of parquet files."""
+    if not isinstance(data, (str, os.PathLike)):
+        return False
+    path = os.fspath(data)
+    return path.endswith('.parquet') or path.endswith('.parq') or os.path.isdir(path)
+
+def read_parquet_columns(path, columns):
+    """This method reads only the given columns of a parquet file (or directory) into an Arrow table, memory mapping the file.
+
+    pyarrow is an optional dependency, it is imported on first use.
+
+    Args:
+        path (str): parquet file or directory.
+        columns (list): the columns to read, the other columns are never decoded.
+    Returns:
+        pyarrow Table : a table with the requested columns.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError('reading parquet files needs pyarrow, pip install pyarrow') from e
+    return pq.read_table(os.fspath(path), columns=list(columns), memory_map=True)
+
+def arrow_to_numpy(array):
+    """This method turns an Arrow Array or ChunkedArray into a numpy array, without copying whenever Arrow allows it.
+
+    Single chunk numeric columns without nulls are returned as a read only view over the Arrow buffer. Dictionary encoded
+    columns become a pandas Categorical built on their integer indices, other columns (strings, nulls, several chunks) are copied.
+
+    Args:
+        array (pyarrow Array or ChunkedArray): the column.
+    Returns:
+        numpy array or pandas Categorical : the column values.
+    """
+    import pyarrow as pa
+    if isinstance(array, pa.ChunkedArray):
+        array = array.chunk(0) if array.num_chunks == 1 else array.combine_chunks()
+    if pa.types.is_dictionary(array.type):
+        codes = array.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+        return pd.Categorical.from_codes(codes, categories=array.dictionary.to_pandas())
+    try:
+        return array.to_numpy(zero_copy_only=True)
+    except (pa.ArrowInvalid, NotImplementedError):
+        return array.to_numpy(zero_copy_only=False)
+
+def read_columns(data, columns):
+    """This method extracts some columns of a table as one dimensional arrays, the input layer of the metric kernels.
+
+    Accepted tables are pandas DataFrames, dictionaries of arrays, numpy structured arrays, Arrow Tables and RecordBatches,
+    Polars DataFrames and parquet paths. Columns are never converted through a pandas DataFrame: pandas columns are returned
+    as Series, structured array fields as numpy views, Arrow and Polars columns as numpy arrays sharing their buffers when
+    the column type allows it (see arrow_to_numpy(..)). Parquet paths only decode the requested columns.
+
+    Examples:
+        >>> read_columns(pq.read_table('scores.parquet'), ['sex', 'prediction', 'reality'])
+
+    Args:
+        data: the table.
+        columns (list): the column names.
+    Returns:
+        dict : column name -> one dimensional array (numpy array, pandas Series or Categorical), in the order of columns.
+    """
+    columns = list(columns)
+    if is_parquet_path(data):
+        data = read_parquet_columns(data, columns)
+    if isinstance(data, (pd.DataFrame, Mapping)):
+        return {c: data[c] for c in columns}
+    if isinstance(data, np.ndarray):
+        if data.dtype.names is None:
+            raise TypeError('numpy input must be a structured array with named fields')
+        return {c: data[c] for c in columns}
+    if _library(data) == 'pyarrow':
+        return {c: arrow_to_numpy(data.column(c)) for c in columns}
+    if _library(data) == 'polars':
+        return {c: data.get_column(c).to_numpy() for c in columns}
+    raise TypeError('unsupported table type ' + type(data).__name__)
@@ -1,30 +1,111 @@
-from .fairness.simmilarity import simmilarity_fairness_hash
-import plotly.graph_objects as go
+import logging
+from .fairness.simmilarity import simmilarity_fairness_pairs
+from .instrumentation import timed
 import numpy as np
-def simmilarity_fairness_3d( cleaned_hsh ) :
-    # 1. Generate synthetic 3D data
-    np.random.seed(42)
-    x_data = [ x[0] for (x,y) in cleaned_hsh ]
-    y_data = [ x[1] for (x,y) in cleaned_hsh ]
-    z_data = [ y[0] for (x,y) in cleaned_hsh]
-    print ( 'x data ', x_data[0:10],' y data ',y_data[0:10] ,'z data ' , z_data[0:10] )
+
+logger = logging.getLogger(__name__)
+
+# above this number of pairs simmilarity_fairness_3d(..) aggregates or samples pairs, browsers slow down well before a million markers
+MAX_PLOT_POINTS = 100000
+
+def pairs_to_arrays(cleaned_hsh):
+    """This method turns [((i,j),(distance,samePrediction)), ...] pairs into three numpy arrays, without intermediate lists.
+
+    Args:
+        cleaned_hsh (list): pairs as returned by simmilarity_fairness_hash(..) or simmilarity_fairness_pairs(..).
+    Returns:
+        tuple : (x, y, z) float64 arrays, the row positions i and j and the distance of every pair.
+    """
+    flat = np.fromiter((v for ((i, j), (d, _)) in cleaned_hsh for v in (i, j, d)), dtype=np.float64, count=3 * len(cleaned_hsh))
+    xyz = flat.reshape(len(cleaned_hsh), 3)
+    return xyz[:, 0], xyz[:, 1], xyz[:, 2]
+
+def sample_points(n, max_points, seed=42):
+    """Returns the sorted positions of exactly min(n, max_points) points drawn uniformly without replacement."""
+    if n <= max_points:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, size=max_points, replace=False))
+
+def density_bins(x, y, z, bins=200):
+    """This method aggregates pairs on a bins x bins grid of (i,j) cells, every non empty cell keeps its most simmilar pair.
+
+    Args:
+        x (numpy array): row positions in the first group.
+        y (numpy array): row positions in the second group.
+        z (numpy array): pair distances.
+        bins (int): number of cells along each axis.
+    Returns:
+        tuple : (x, y, z, count) arrays with one entry per non empty cell, the cell center, the lowest distance of the cell
+        and its number of pairs.
+    """
+    (x_edges, y_edges) = (np.linspace(np.min(x), np.max(x), bins + 1), np.linspace(np.min(y), np.max(y), bins + 1))
+    bx = np.clip(np.searchsorted(x_edges, x, side='right') - 1, 0, bins - 1)
+    by = np.clip(np.searchsorted(y_edges, y, side='right') - 1, 0, bins - 1)
+    cell = bx * bins + by
+    order = np.lexsort((z, cell))
+    cells, first = np.unique(cell[order], return_index=True)
+    count = np.bincount(cell, minlength=bins * bins)[cells]
+    (cx, cy) = np.divmod(cells, bins)
+    return (x_edges[cx] + x_edges[cx + 1]) / 2, (y_edges[cy] + y_edges[cy + 1]) / 2, z[order][first], count
+
+def simmilarity_fairness_3d( cleaned_hsh, mode='auto', max_points=MAX_PLOT_POINTS, bins=200, seed=42 ) :
+    """This method builds the 3D scatter plot of simmilar pairs: (X,Y) are the row positions of the two individuals and Z
+    their distance, the closer to Z=0 the redder.
+
+    Points are sent to plotly as numpy arrays (binary encoded, rendered with WebGL) instead of python lists, and large audits
+    are reduced to at most max_points markers.
+
+    Args:
+        cleaned_hsh (list): pairs as returned by simmilarity_fairness_pairs(..), or an (x, y, z) tuple of arrays.
+        mode (str): 'points' plots every pair, 'sample' plots exactly min(#pairs, max_points) uniformly drawn pairs, 'density'
+        plots one marker per non empty cell of a bins x bins grid (its most simmilar pair, the pair count is on hover),
+        'auto' plots every pair up to max_points and the density grid above.
+        max_points (int): maximum number of markers of 'sample' and 'auto' modes.
+        bins (int): grid resolution of 'density' mode.
+        seed (int): seed of 'sample' mode.
+    Returns:
+        plotly Figure : the figure.
+    """
+    # plotly is heavy to import, it is only loaded when a figure is built
+    import plotly.graph_objects as go
+    (x_data, y_data, z_data) = cleaned_hsh if isinstance(cleaned_hsh, tuple) else pairs_to_arrays(cleaned_hsh)
+    if mode == 'auto':
+        mode = 'points' if len(z_data) <= max_points else 'density'
+    count = None
+    if mode == 'sample':
+        keep = sample_points(len(z_data), max_points, seed)
+        (x_data, y_data, z_data) = (x_data[keep], y_data[keep], z_data[keep])
+    elif mode == 'density' and len(z_data) > 0:
+        (x_data, y_data, z_data, count) = density_bins(x_data, y_data, z_data, bins)
+    elif mode not in ('points', 'density'):
+        raise ValueError('mode must be auto, points, sample or density')
+    logger.debug('x data %s y data %s z data %s', x_data[0:10], y_data[0:10], z_data[0:10])
     # 2. Construct the 3D Scatter Plot
-    fig = go.Figure(data=[go.Scatter3d(x=x_data,
-                                   y=y_data,
-                                   z=z_data,
-                                   mode="markers",
-                                   marker=dict(color=[1/x for x in z_data],colorscale='reds'),
-                                   hovertemplate=("<b>Point:</b> %{customdata[0]}<br><b>Coordinates:</b> (%{x:.2f}, %{y:.2f}, Simmilarity %{z:.2f})<br><extra></extra>"),
-            )
-        ]
-    )
+    with timed(logger, 'simmilarity_fairness_3d.figure', points=len(x_data), mode=mode):
+        if count is None:
+            customdata = np.column_stack((x_data, y_data)).astype(np.int64)
+            hovertemplate = "<b>Pair:</b> (%{customdata[0]}, %{customdata[1]})<br><b>Simmilarity distance:</b> %{z:.2f}<extra></extra>"
+        else:
+            customdata = count
+            hovertemplate = "<b>Cell:</b> (%{x:.0f}, %{y:.0f})<br><b>Pairs:</b> %{customdata}<br><b>Lowest distance:</b> %{z:.2f}<extra></extra>"
+        fig = go.Figure(data=[go.Scatter3d(x=x_data.astype(np.float32),
+                                       y=y_data.astype(np.float32),
+                                       z=z_data.astype(np.float32),
+                                       mode="markers",
+                                       # 1/(1+d) instead of 1/d, identical pairs have a distance of 0
+                                       marker=dict(color=1 / (1 + z_data), colorscale='reds', size=3),
+                                       customdata=customdata,
+                                       hovertemplate=hovertemplate,
+                )
+            ]
+        )
     fig.update_layout(title="Interactive 3D Scatter Plot with Custom Tooltips",scene=dict(xaxis_title="Dimension X", yaxis_title="Dimension Y", zaxis_title="Dimension Z"),
     width=900,
     height=700,
     margin=dict(l=0, r=0, b=0, t=40))
     return fig
 
-def similar_subjects_treatment_plot( data, sensitive_column, sensitive_attribute_values ,numrows,attr_sim_compas,simmilarity_distance='catnum_simmilarity_distance'):
+def similar_subjects_treatment_plot( data, sensitive_column, sensitive_attribute_values ,numrows,attr_sim_compas,simmilarity_distance='catnum_simmilarity_distance', mode='auto', max_points=MAX_PLOT_POINTS):
     '''
     This method produce a 3d plot , (X,Y) corresponds to individuals in different set partitions . 
     Z coordinates show such pairs that being simmilar, had different treatment by your model. The closer to the
@@ -37,10 +118,11 @@ def similar_subjects_treatment_plot( data, sensitive_column, sensitive_attribute
     simmilarity_attr_hsh : for the moment we are using a simmilarity distance based on adding up 1 whenver two categorical columns of two rows are different, and adding up 
     absolute value if they are two numerical columns.
     simmilarity_distance only the value catnum_simmilarity_distance from the moment
+    mode, max_points : how large audits are rendered, see simmilarity_fairness_3d(..).
 
-    NOTE THAT UP TO NOW IS FROM 1 TO 100 ROWS, MUST BE CHANGED !!!!!!
+    Any number of rows can be audited: only the close pairs (distance up to 5) treated differently are kept, and with the
+    default mode='auto' they are plotted one marker per pair up to max_points pairs, as a density grid above.
     '''
-    hsh = simmilarity_fairness_hash( data , sensitive_column , sensitive_attribute_values ,attr_sim_compas,numrows )
-    cleaned_hsh = [(x,y) for (x,y) in hsh if y[1] == False and y[0] <= 5 ]
-    figu = simmilarity_fairness_3d( cleaned_hsh )
+    cleaned_hsh = simmilarity_fairness_pairs( data , sensitive_column , sensitive_attribute_values ,attr_sim_compas,numrows, max_distance=5, different_treatment=True, simmilarity_distance=simmilarity_distance )
+    figu = simmilarity_fairness_3d( cleaned_hsh, mode=mode, max_points=max_points )
     figu.show()
\ No newline at end of file
@@ -0,0 +1,135 @@
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import repeat
+import pandas as pd
+from kafkanator.fairness.confusion import GroupConfusionCounts, group_confusion_counts
+from kafkanator.fairness.metrics import fairness_metrics_table_from_counts
+from kafkanator.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# rows per CSV chunk or parquet record batch, memory is proportional to it and not to the file size
+DEFAULT_CHUNK_ROWS = 1000000
+PARQUET_EXTENSIONS = ('.parquet', '.parq')
+CSV_EXTENSIONS = ('.csv', '.csv.gz', '.csv.bz2', '.csv.zip', '.csv.xz')
+
+def _file_format(path, file_format):
+    if file_format is not None:
+        return file_format
+    if path.endswith(PARQUET_EXTENSIONS):
+        return 'parquet'
+    if path.endswith(CSV_EXTENSIONS):
+        return 'csv'
+    raise ValueError('cannot guess the format of ' + path + ', set file_format to parquet or csv')
+
+def list_partitions(paths, file_format=None):
+    """This method expands files, directories (searched recursively, as hive partitioned datasets) and glob patterns into a
+    sorted list of data files.
+
+    Args:
+        paths (str or list): one or several files, directories or glob patterns.
+        file_format (str, optional): 'parquet' or 'csv', guessed from the file extensions by default.
+    Returns:
+        list : the data file paths.
+    """
+    paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+    extensions = {'parquet': PARQUET_EXTENSIONS, 'csv': CSV_EXTENSIONS}.get(file_format, PARQUET_EXTENSIONS + CSV_EXTENSIONS)
+    files = []
+    for path in map(os.fspath, paths):
+        if os.path.isdir(path):
+            for (root, _, names) in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names if name.endswith(extensions) and not name.startswith(('.', '_')))
+        elif any(c in path for c in '*?['):
+            files.extend(glob.glob(path, recursive=True))
+        else:
+            files.append(path)
+    return sorted(files)
+
+def _chunks(path, columns, file_format, chunk_rows):
+    """This PRIVATE method yields the columns of a data file chunk by chunk, other columns are never parsed."""
+    if _file_format(path, file_format) == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError('reading parquet files needs pyarrow, pip install pyarrow') from e
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield pa.Table.from_batches([batch])
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+def partition_confusion_counts(path, sensitive_attribute, predict_column, reality_column, file_format=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """This method streams one data file and accumulates the confusion counts of every sensitive group.
+
+    Args:
+        path (str): a parquet or CSV file.
+        sensitive_attribute (str or list): the sensitive attribute column(s).
+        predict_column (str): the prediction column.
+        reality_column (str): the reality column.
+        file_format (str, optional): 'parquet' or 'csv', guessed from the extension by default.
+        chunk_rows (int): rows per chunk.
+    Returns:
+        GroupConfusionCounts : the per group counts of the file.
+    """
+    sensitive_columns = [sensitive_attribute] if isinstance(sensitive_attribute, str) else list(sensitive_attribute)
+    columns = list(dict.fromkeys(sensitive_columns + [predict_column, reality_column]))
+    counts = GroupConfusionCounts([], [])
+    with timed(logger, 'audit.partition', path=path) as span:
+        for chunk in _chunks(path, columns, file_format, chunk_rows):
+            counts = counts.merge(group_confusion_counts(chunk, sensitive_attribute, predict_column, reality_column))
+        span['rows'] = int(counts.n.sum())
+    return counts
+
+def file_confusion_counts(paths, sensitive_attribute, predict_column, reality_column, file_format=None, chunk_rows=DEFAULT_CHUNK_ROWS, n_jobs=None):
+    """This method computes the per group confusion counts of a dataset stored as parquet or CSV files, out of core.
+
+    Only the sensitive, prediction and reality columns are read, chunk by chunk, so memory depends on chunk_rows and the
+    number of groups but not on the size of the dataset. Partitions (files) are counted independently, in parallel
+    processes with n_jobs > 1, and their counts are merged.
+
+    Args:
+        paths (str or list): files, directories or glob patterns, see list_partitions(..).
+        sensitive_attribute (str or list): the sensitive attribute column(s).
+        predict_column (str): the prediction column.
+        reality_column (str): the reality column.
+        file_format (str, optional): 'parquet' or 'csv', guessed from the file extensions by default.
+        chunk_rows (int): rows per CSV chunk or parquet record batch.
+        n_jobs (int, optional): number of worker processes, None or 1 reads the partitions in the calling process.
+    Returns:
+        GroupConfusionCounts : the per group counts of the whole dataset.
+    """
+    files = list_partitions(paths, file_format)
+    if len(files) == 0:
+        raise ValueError('no data file found in ' + str(paths))
+    args = (repeat(sensitive_attribute), repeat(predict_column), repeat(reality_column), repeat(file_format), repeat(chunk_rows))
+    if n_jobs is None or n_jobs <= 1:
+        partitions = map(partition_confusion_counts, files, *args)
+        return reduce(GroupConfusionCounts.merge, partitions)
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return reduce(GroupConfusionCounts.merge, pool.map(partition_confusion_counts, files, *args))
+
+def fairness_metrics_table_from_files(paths,sensitive_attribute,predict_column,reality_column,aggregate_metrics=False,function_last_column=None,label_last_column='DELTA',file_format=None,chunk_rows=DEFAULT_CHUNK_ROWS,n_jobs=None):
+    """This method computes the fairness_metrics_table(..) of a dataset too large for memory, stored as parquet or CSV files.
+
+    Examples:
+        >>> fairness_metrics_table_from_files('scores/', ['race'], 'prediction', 'reality', aggregate_metrics=True, n_jobs=8)
+
+    Args:
+        paths (str or list): files, directories (for example a partitioned parquet dataset) or glob patterns.
+        sensitive_attribute (list): the sensitive attribute columns.
+        predict_column (str): the prediction column.
+        reality_column (str): the reality column.
+        aggregate_metrics (boolean): True to add the last column comparing groups.
+        function_last_column (list, optional): precomputed last column.
+        label_last_column (str): label of the last column.
+        file_format (str, optional): 'parquet' or 'csv', guessed from the file extensions by default.
+        chunk_rows (int): rows per CSV chunk or parquet record batch.
+        n_jobs (int, optional): number of worker processes reading partitions.
+    Returns:
+        DataFrame : the same table as fairness_metrics_table(..) on the concatenated files.
+    """
+    counts = file_confusion_counts(paths, sensitive_attribute, predict_column, reality_column, file_format, chunk_rows, n_jobs)
+    return fairness_metrics_table_from_counts(counts, aggregate_metrics, function_last_column, label_last_column)
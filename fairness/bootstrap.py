@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+import warnings
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.confusion import METRIC_ROWS, GroupConfusionCounts, group_confusion_counts
+
+# replicates drawn by one generator, fixed so results only depend on the seed and not on n_jobs
+REPLICATES_PER_TASK = 500
+
+def _table_metrics(counts):
+    """This PRIVATE method returns the (metric, ..., group) array of the fairness_metrics_table(..) rows."""
+    return np.stack([counts.positive_rate(), counts.tpr(), counts.ppv(), counts.prevalence()])
+
+def _last_column(metrics):
+    """This PRIVATE method computes the build_last_column(..) comparison of all the groups along the group (last) axis: max - min
+    for parity rows, min / max for the disparate impact prevalence ratio."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = np.max(metrics, axis=-1) - np.min(metrics, axis=-1)
+        ratio = np.min(metrics[3], axis=-1) / np.max(metrics[3], axis=-1)
+    delta[3] = ratio
+    return delta
+
+def bootstrap_counts(counts, n_replicates, seed_sequence):
+    """This method resamples per group confusion counts: every group keeps its size n_g and its four cells are drawn from a
+    multinomial with the observed cell frequencies, which is the same as resampling the rows of each group with replacement.
+
+    Args:
+        counts (GroupConfusionCounts): the observed counts.
+        n_replicates (int): number of bootstrap replicates.
+        seed_sequence (numpy SeedSequence or int): seed of the random generator.
+    Returns:
+        numpy array : (n_replicates, groups, 2, 2) resampled counts.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    n = counts.n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pvals = np.where(n[:, None] > 0, counts.counts.reshape(len(n), 4) / n[:, None], 0.25)
+    draws = rng.multinomial(n, pvals, size=(n_replicates, len(n)))
+    return draws.reshape(n_replicates, len(n), 2, 2)
+
+def _replicate_metrics(counts, n_replicates, seed_sequence):
+    """This PRIVATE method returns the (replicate, metric, group) metrics and the (replicate, metric) last column of n_replicates draws."""
+    resampled = GroupConfusionCounts(counts.keys, bootstrap_counts(counts, n_replicates, seed_sequence))
+    metrics = _table_metrics(resampled)
+    return np.moveaxis(metrics, 1, 0), _last_column(metrics).T
+
+def fairness_metrics_bootstrap_from_counts(counts,n_replicates=1000,confidence=0.95,seed=None,n_jobs=None,label_last_column='DELTA'):
+    """This method computes percentile bootstrap confidence intervals of the fairness_metrics_table(..) values from group counts.
+
+    Args:
+        counts (GroupConfusionCounts): the per group confusion counts.
+        n_replicates (int): number of bootstrap replicates.
+        confidence (float): confidence level of the intervals.
+        seed (int, optional): seed, the same seed gives the same intervals whatever n_jobs.
+        n_jobs (int, optional): number of threads drawing replicates, None draws them in the calling thread.
+        label_last_column (str): label of the group comparison column (max - min, and min / max for the prevalence ratio).
+    Returns:
+        DataFrame : rows are the table metrics, columns are (group, 'value' / 'lower' / 'upper') pairs, plus (label_last_column, ...).
+    """
+    if n_replicates < 1:
+        raise ValueError('n_replicates must be at least 1, got ' + str(n_replicates))
+    tasks = [REPLICATES_PER_TASK] * (n_replicates // REPLICATES_PER_TASK)
+    if n_replicates % REPLICATES_PER_TASK > 0:
+        tasks.append(n_replicates % REPLICATES_PER_TASK)
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    if n_jobs is None or n_jobs <= 1:
+        results = [_replicate_metrics(counts, r, s) for (r, s) in zip(tasks, seeds)]
+    else:
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(lambda task: _replicate_metrics(counts, task[0], task[1]), zip(tasks, seeds)))
+    metrics = np.concatenate([m for (m, l) in results])
+    last = np.concatenate([l for (m, l) in results])
+    alpha = (1 - confidence) / 2
+    point = _table_metrics(counts)
+    columns = {}
+    names = [','.join(str(y) for y in k) if isinstance(k, tuple) else str(k) for k in counts.keys]
+    with warnings.catch_warnings():
+        # groups without positives give nan replicates, their quantiles are nan as well
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for (g, name) in enumerate(names):
+            columns[(name, 'value')] = point[:, g]
+            columns[(name, 'lower')] = np.nanquantile(metrics[:, :, g], alpha, axis=0)
+            columns[(name, 'upper')] = np.nanquantile(metrics[:, :, g], 1 - alpha, axis=0)
+        columns[(label_last_column, 'value')] = _last_column(point)
+        columns[(label_last_column, 'lower')] = np.nanquantile(last, alpha, axis=0)
+        columns[(label_last_column, 'upper')] = np.nanquantile(last, 1 - alpha, axis=0)
+    return pd.DataFrame(columns, index=METRIC_ROWS)
+
+def fairness_metrics_bootstrap(dataset,sensitive_attribute,predict_column,reality_column,n_replicates=1000,confidence=0.95,seed=None,n_jobs=None,label_last_column='DELTA'):
+    """This method computes the fairness_metrics_table(..) values with bootstrap confidence intervals. The data is scanned once to
+    count the per group confusion matrices, replicates are then drawn from those counts, never from the rows.
+
+    Args:
+        dataset (pandas DataFrame): dataframe with the sensitive attribute column(s), and binary {1,0} prediction and reality columns.
+        sensitive_attribute (str or list): The column designing the sensitive attribute : sex, age, handicap, nationality etc.
+        predict_column (str): the column where dataframe df stores prediction.
+        reality_column (str): the column where dataframe df stores what happens in reality.
+        n_replicates (int): number of bootstrap replicates.
+        confidence (float): confidence level of the intervals.
+        seed (int, optional): seed, the same seed gives the same intervals whatever n_jobs.
+        n_jobs (int, optional): number of threads drawing replicates.
+        label_last_column (str): label of the group comparison column.
+    Returns:
+        DataFrame : see fairness_metrics_bootstrap_from_counts(..).
+    """
+    counts = group_confusion_counts(dataset, sensitive_attribute, predict_column, reality_column)
+    return fairness_metrics_bootstrap_from_counts(counts, n_replicates, confidence, seed, n_jobs, label_last_column)
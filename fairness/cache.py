@@ -0,0 +1,138 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+_active_cache = None
+
+def _column_digest(values, fingerprint, sample_rows):
+    """This PRIVATE method hashes one column. Numerical buffers are hashed as bytes, categoricals through their codes and
+    categories, other columns (strings, objects) through pandas' vectorized hash_array. Nothing of the column is kept."""
+    if isinstance(values, pd.Series):
+        values = values.array
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(values, pd.Categorical):
+        digest.update(_column_digest(values.categories.to_numpy(), 'full', sample_rows))
+        values = values.codes
+    values = np.asarray(values)
+    digest.update(str((values.dtype.str, values.shape)).encode())
+    if fingerprint == 'sample' and len(values) > sample_rows:
+        values = values[np.linspace(0, len(values) - 1, sample_rows).astype(np.int64)]
+    if values.dtype.kind in 'biufcmM':
+        digest.update(np.ascontiguousarray(values).view(np.uint8).data)
+    else:
+        digest.update(pd.util.hash_array(values.astype(object).ravel()).data)
+    return digest.digest()
+
+def _entry_bytes(value):
+    """This PRIVATE method estimates the memory held by a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    counts = getattr(value, 'counts', None)
+    if isinstance(counts, np.ndarray):
+        return counts.nbytes + sum(sys.getsizeof(k) for k in value.keys)
+    return sys.getsizeof(value)
+
+class CountsCache:
+    """LRU cache of the per group count summaries (confusion counts, prediction counts) the metric functions are built on.
+
+    Entries are keyed by a fingerprint of the columns a metric reads, so the same data under another DataFrame object still
+    hits, and a modified column misses. Once cached, a metric call costs the fingerprint plus O(#groups).
+
+    Examples:
+        >>> with counts_cache(max_bytes=2**26) as cache:
+        ...     statistical_parity(df, 'sex', 'prediction', 'reality')
+        ...     fairness_metrics_table(df, 'sex', 'prediction', 'reality')  # counted once
+        >>> cache.hits
+
+    Args:
+        max_entries (int): maximum number of cached summaries.
+        max_bytes (int): memory cap of the cached summaries, least recently used entries are evicted first.
+        fingerprint (str): 'full' hashes every value of the columns on every call, O(n): numerical and category columns are
+        hashed at memory speed, string columns cost about as much to hash as to count, so store them as category to get
+        cheap hits. 'sample' only hashes sample_rows evenly spaced rows plus the length and dtypes, which is O(1) but misses
+        in place edits of the other rows.
+        sample_rows (int): rows hashed per column in 'sample' mode.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 2 ** 20, fingerprint='full', sample_rows=4096):
+        if fingerprint not in ('full', 'sample'):
+            raise ValueError('fingerprint must be full or sample')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint
+        self.sample_rows = sample_rows
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, kind, arrays, parameters=()):
+        """Builds the cache key of a summary.
+
+        Args:
+            kind (str): the summary type, for example 'confusion'.
+            arrays (dict): column name -> values of every column the summary reads.
+            parameters (tuple): anything else the summary depends on, hashable.
+        Returns:
+            tuple : the key.
+        """
+        digests = tuple((str(name), _column_digest(values, self.fingerprint, self.sample_rows)) for (name, values) in arrays.items())
+        return (kind, digests, parameters)
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value of key, or computes it with compute() and caches it."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        value = compute()
+        size = _entry_bytes(value)
+        with self._lock:
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (value, size)
+                self.nbytes += size
+                while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                    (_, (_, evicted)) = self._entries.popitem(last=False)
+                    self.nbytes -= evicted
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+def active_cache():
+    """Returns the enabled CountsCache, None when caching is off (the default)."""
+    return _active_cache
+
+def enable_counts_cache(max_entries=256, max_bytes=64 * 2 ** 20, fingerprint='full', sample_rows=4096):
+    """Turns on the process wide count cache, see CountsCache for the arguments. Returns the cache."""
+    global _active_cache
+    _active_cache = CountsCache(max_entries, max_bytes, fingerprint, sample_rows)
+    return _active_cache
+
+def disable_counts_cache():
+    """Turns off and drops the process wide count cache."""
+    global _active_cache
+    _active_cache = None
+
+@contextmanager
+def counts_cache(max_entries=256, max_bytes=64 * 2 ** 20, fingerprint='full', sample_rows=4096):
+    """Enables a count cache for the duration of a with block, the previous cache (or no cache) is restored afterwards."""
+    global _active_cache
+    previous = _active_cache
+    _active_cache = CountsCache(max_entries, max_bytes, fingerprint, sample_rows)
+    try:
+        yield _active_cache
+    finally:
+        _active_cache = previous
@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+from kafkanator.columnar import read_columns
+from kafkanator.fairness.cache import active_cache
+
+# row labels of the fairness_metrics_table(..) metrics computed from the confusion counts
+METRIC_ROWS = ['DEMOGRAPHIC PARITY - P1','EQUAL OPPORTUNITY - TPR','PREDICTIVE PARITY - PPV','DISPARATE IMPACT - PREVALENCE']
+
+def _as_binary(values, column):
+    """This PRIVATE method turns a prediction / reality column into an int64 array of {0,1}.
+
+    Args:
+        values (array like): the column values.
+        column (str): the column name, used on the error message.
+    Returns:
+        numpy array : int64 array containing only 0 and 1.
+    """
+    values = np.asarray(values)
+    binary = values.astype(np.int64)
+    if ((binary != values) | (binary < 0) | (binary > 1)).any():
+        raise ValueError('column ' + str(column) + ' must contain a binary {1,0} value on every row')
+    return binary
+
+def group_codes(df, sensitive_attribute):
+    """This method encodes the sensitive attribute values of every row as an integer group code.
+
+    Codes follow the order of df.groupby(by=sensitive_attribute), rows having a null sensitive value get code -1
+    (groupby drops them as well).
+
+    Args:
+        df (table): dataframe containing the sensitive attribute column(s), or any table read_columns(..) accepts.
+        sensitive_attribute (str or list): The column (or list of columns) designing the sensitive attribute : sex, age, handicap, nationality etc.
+    Returns:
+        (codes,keys) : codes is an int64 array with one group code per row, keys is the list of group keys, a scalar per group if
+        sensitive_attribute is a str and a tuple per group if it is a list, exactly like groupby keys.
+    """
+    columns = [sensitive_attribute] if isinstance(sensitive_attribute, str) else list(sensitive_attribute)
+    arrays = read_columns(df, columns)
+    col_codes = []
+    col_uniques = []
+    for c in columns:
+        codes, uniques = pd.factorize(arrays[c], sort=True)
+        col_codes.append(codes.astype(np.int64))
+        col_uniques.append(uniques.tolist())
+    valid = np.ones(len(col_codes[0]), dtype=bool)
+    for codes in col_codes:
+        valid &= codes >= 0
+    dims = tuple(max(len(u), 1) for u in col_uniques)
+    combined = np.ravel_multi_index([np.where(valid, codes, 0) for codes in col_codes], dims)
+    used, inverse = np.unique(combined[valid], return_inverse=True)
+    codes = np.full(len(valid), -1, dtype=np.int64)
+    codes[valid] = inverse
+    positions = np.unravel_index(used, dims)
+    keys = list(zip(*[[u[p] for p in pos] for (u, pos) in zip(col_uniques, positions)]))
+    if isinstance(sensitive_attribute, str):
+        keys = [k[0] for k in keys]
+    return codes, keys
+
+class GroupConfusionCounts:
+    """Confusion matrices of every sensitive group, computed in a single pass and stored in one (groups,2,2) array.
+
+    counts[g] follows the sklearn confusion_matrix layout, rows are reality and columns are predictions, so
+    counts[g,0,0] = TN, counts[g,0,1] = FP, counts[g,1,0] = FN and counts[g,1,1] = TP. Every group fairness metric
+    of the package is a ratio of these counts, so they are computed once and shared.
+
+    Counts may carry leading dimensions, for example (replicates, groups, 2, 2) bootstrap counts, metrics are then computed
+    for every replicate at once. Counts of several prediction columns (models) have shape (models, groups, 2, 2) and name
+    them in models.
+
+    Args:
+        keys (list): group keys, as returned by group_codes(..).
+        counts (numpy array): integer array of shape (len(keys),2,2), or (..., len(keys),2,2).
+        models (list, optional): names of the models along the first dimension of counts.
+    """
+
+    def __init__(self, keys, counts, models=None):
+        self.keys = list(keys)
+        counts = np.asarray(counts, dtype=np.int64)
+        self.counts = counts.reshape(len(self.keys), 2, 2) if counts.ndim < 3 else counts
+        self.models = list(models) if models is not None else None
+
+    @property
+    def tn(self):
+        return self.counts[..., 0, 0]
+
+    @property
+    def fp(self):
+        return self.counts[..., 0, 1]
+
+    @property
+    def fn(self):
+        return self.counts[..., 1, 0]
+
+    @property
+    def tp(self):
+        return self.counts[..., 1, 1]
+
+    @property
+    def n(self):
+        return self.counts.sum(axis=(-2, -1))
+
+    @staticmethod
+    def _ratio(num, den):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return num / den
+
+    def positive_rate(self):
+        """P(prediction = 1) per group (statistical parity)."""
+        return self._ratio(self.tp + self.fp, self.n)
+
+    def tpr(self):
+        """True positive rate per group (equal opportunity)."""
+        return self._ratio(self.tp, self.tp + self.fn)
+
+    def fpr(self):
+        """False positive rate per group."""
+        return self._ratio(self.fp, self.fp + self.tn)
+
+    def fnr(self):
+        """False negative rate per group."""
+        return self._ratio(self.fn, self.fn + self.tp)
+
+    def ppv(self):
+        """Positive predictive value per group (predictive parity)."""
+        return self._ratio(self.tp, self.tp + self.fp)
+
+    def prevalence(self):
+        """P(reality = 1) per group (disparate impact)."""
+        return self._ratio(self.tp + self.fn, self.n)
+
+    def to_dict(self, values):
+        """Maps a per group array, for example self.tpr(), to a {group key: value} dictionary."""
+        return dict(zip(self.keys, values))
+
+    def model(self, m):
+        """Returns the GroupConfusionCounts of the m-th model (position, not name) of multi model counts."""
+        return GroupConfusionCounts(self.keys, self.counts[m])
+
+    def merge(self, other):
+        """Adds the counts of another GroupConfusionCounts, for example computed on another chunk or partition of the data.
+
+        Args:
+            other (GroupConfusionCounts): counts with the same leading dimensions, its groups may differ from self groups.
+        Returns:
+            GroupConfusionCounts : new counts over the union of the groups, sorted like groupby keys.
+        """
+        keys = list(dict.fromkeys(self.keys + other.keys))
+        try:
+            keys.sort()
+        except TypeError:
+            pass
+        position = {k: p for (p, k) in enumerate(keys)}
+        counts = np.zeros(self.counts.shape[:-3] + (len(keys), 2, 2), dtype=np.int64)
+        counts[..., [position[k] for k in self.keys], :, :] += self.counts
+        counts[..., [position[k] for k in other.keys], :, :] += other.counts
+        return GroupConfusionCounts(keys, counts, self.models)
+
+def group_confusion_counts(df, sensitive_attribute, predict_column, reality_column):
+    """This method computes the confusion matrix of every sensitive group with one bincount over the whole dataframe.
+
+    Args:
+        df (table): dataframe . It must contain one or more sensitive attribute columns S
+        containing {v1,v2,v3,...,vn} different sensitive attributes values, and one prediction column P containing a binary prediction {1,0}.
+        Arrow tables, Polars DataFrames, numpy structured arrays and parquet paths are read column by column, see read_columns(..).
+        sensitive_attribute (str or list): The column designing the sensitive attribute : sex, age, handicap, nationality etc.
+        predict_column (str, list or array): the column where dataframe df stores prediction. A 1-D numpy array or pandas Series
+        gives the predictions of one model by row position. A list of columns, or a (rows, models) prediction matrix, evaluates
+        several models at once: groups are encoded a single time and every model is counted by the same bincount.
+        reality_column (str): the column where dataframe df stores what happens in reality.
+    Returns:
+        GroupConfusionCounts : the per group TN, FP, FN, TP counts, of shape (models, groups, 2, 2) with models named after the
+        prediction columns (positions for a matrix) when several predictions are given.
+    """
+    sensitive_columns = [sensitive_attribute] if isinstance(sensitive_attribute, str) else list(sensitive_attribute)
+    is_array = isinstance(predict_column, (np.ndarray, pd.Series))
+    if isinstance(predict_column, str):
+        (prediction_columns, models, name) = ([predict_column], None, predict_column)
+    elif is_array:
+        if np.ndim(predict_column) not in (1, 2):
+            raise ValueError('a prediction array must be 1-D (one model) or 2-D (rows, models), got ' + str(np.ndim(predict_column)) + ' dimensions')
+        two_d = np.ndim(predict_column) == 2
+        (prediction_columns, models, name) = ([], list(range(predict_column.shape[1])) if two_d else None, 'prediction matrix' if two_d else 'prediction array')
+    else:
+        (prediction_columns, models, name) = (list(predict_column), list(predict_column), 'prediction columns')
+    # only the needed columns are extracted, once, a parquet file is then decoded a single time
+    arrays = read_columns(df, list(dict.fromkeys(sensitive_columns + prediction_columns + [reality_column])))
+    if is_array:
+        prediction = np.asarray(predict_column)
+        if prediction.shape[0] != len(arrays[reality_column]):
+            raise ValueError('the ' + name + ' has ' + str(prediction.shape[0]) + ' rows but the data has ' + str(len(arrays[reality_column])))
+    elif models is None:
+        prediction = arrays[predict_column]
+    else:
+        prediction = np.column_stack([np.asarray(arrays[c]) for c in prediction_columns])
+
+    def count():
+        codes, keys = group_codes(arrays, sensitive_attribute)
+        return confusion_counts_from_codes(codes, keys, prediction, arrays[reality_column], name, reality_column)
+
+    cache = active_cache()
+    if cache is None:
+        counts = count()
+    else:
+        # the sensitive attribute type matters, a str gives scalar group keys and a list tuple keys
+        read = {c: arrays[c] for c in sensitive_columns + [reality_column]}
+        read['__prediction__'] = prediction
+        key = cache.key('confusion', read, (isinstance(sensitive_attribute, str), tuple(sensitive_columns), reality_column))
+        cached = cache.get_or_compute(key, count)
+        counts = GroupConfusionCounts(cached.keys, cached.counts.copy())
+    counts.models = models
+    return counts
+
+def confusion_counts_from_codes(codes, keys, prediction, reality, predict_column='prediction', reality_column='reality'):
+    """This method counts the confusion matrices of already encoded groups with a single bincount.
+
+    Args:
+        codes (numpy array): group code of every row, -1 for rows to ignore, see group_codes(..).
+        keys (list): group keys, keys[c] is the key of code c.
+        prediction (array like): binary {1,0} predictions, or a (rows, models) matrix of predictions of several models.
+        reality (array like): binary {1,0} realities.
+        predict_column (str): prediction name, used on error messages.
+        reality_column (str): reality name, used on error messages.
+    Returns:
+        GroupConfusionCounts : the per group TN, FP, FN, TP counts, of shape (models, groups, 2, 2) for a prediction matrix.
+    """
+    prediction = _as_binary(prediction, predict_column)
+    reality = _as_binary(reality, reality_column)
+    valid = codes >= 0
+    if prediction.ndim == 1:
+        cell = (codes * 4 + reality * 2 + prediction)[valid]
+        counts = np.bincount(cell, minlength=len(keys) * 4)
+        return GroupConfusionCounts(keys, counts)
+    n_models = prediction.shape[1]
+    # model m owns the cells [m * groups * 4, (m + 1) * groups * 4)
+    cell = (codes * 4 + reality * 2)[valid, None] + prediction[valid] + np.arange(n_models) * (len(keys) * 4)
+    counts = np.bincount(cell.ravel(), minlength=n_models * len(keys) * 4)
+    return GroupConfusionCounts(keys, counts.reshape(n_models, len(keys), 2, 2), list(range(n_models)))
@@ -0,0 +1,74 @@
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.confusion import METRIC_ROWS, GroupConfusionCounts, group_confusion_counts
+
+def _metric_rows(counts):
+    """This PRIVATE method computes the table metrics of every group of counts as columns."""
+    return {'n': counts.n, METRIC_ROWS[0]: counts.positive_rate(), METRIC_ROWS[1]: counts.tpr(),
+            METRIC_ROWS[2]: counts.ppv(), METRIC_ROWS[3]: counts.prevalence()}
+
+def roll_up(key_codes, counts, positions):
+    """This method aggregates a cube of confusion counts onto a subset of its attributes.
+
+    Args:
+        key_codes (numpy array): (cells, attributes) integer codes of the cube cells.
+        counts (numpy array): (cells,2,2) confusion counts of the cube cells.
+        positions (list): the attribute positions (columns of key_codes) to keep.
+    Returns:
+        tuple : (key_codes, counts) of the rolled up cube, cells sorted by their codes.
+    """
+    cells, inverse = np.unique(key_codes[:, positions], axis=0, return_inverse=True)
+    rolled = np.zeros((len(cells), 2, 2), dtype=np.int64)
+    np.add.at(rolled, inverse.reshape(-1), counts)
+    return cells, rolled
+
+def intersectional_metrics(dataset,sensitive_attributes,predict_column,reality_column,subsets=False,min_support=1):
+    """This method computes the group fairness metrics of every intersection of several sensitive attributes (race x sex x age band ...)
+    from a single cube of confusion counts.
+
+    The data is scanned once to count the confusion matrix of every observed combination of the sensitive attributes. With subsets=True
+    every smaller combination (race x sex, race, sex, ...) is rolled up from a cube one attribute larger, never from the data again.
+    Subgroups with fewer than min_support rows are pruned at output time, after the roll-ups, so the larger subgroups still count the
+    rows of their small intersections; only the metrics of the pruned subgroups are never computed.
+
+    Args:
+        dataset (pandas DataFrame): dataframe with the sensitive attribute columns, and binary {1,0} prediction and reality columns.
+        sensitive_attributes (list): the sensitive attribute columns to cross.
+        predict_column (str): the column where dataframe df stores prediction.
+        reality_column (str): the column where dataframe df stores what happens in reality.
+        subsets (boolean): True to also audit every non empty subset of sensitive_attributes.
+        min_support (int): minimum number of rows of an audited subgroup.
+    Returns:
+        DataFrame : one row per audited subgroup with a column per sensitive attribute (null when the attribute is rolled up), a
+        'level' column naming the crossed attributes, the subgroup size 'n' and the metrics of fairness_metrics_table(..).
+    """
+    attributes = list(sensitive_attributes)
+    cube = group_confusion_counts(dataset, attributes, predict_column, reality_column)
+    values = []
+    key_codes = np.zeros((len(cube.keys), len(attributes)), dtype=np.int64)
+    for a in range(len(attributes)):
+        key_codes[:, a], uniques = pd.factorize(pd.Series([k[a] for k in cube.keys], dtype=object), sort=True)
+        values.append(list(uniques))
+    cubes = {tuple(range(len(attributes))): (key_codes, cube.counts)}
+    levels = [tuple(range(len(attributes)))]
+    if subsets:
+        for size in range(len(attributes) - 1, 0, -1):
+            for level in combinations(range(len(attributes)), size):
+                # parent: the already computed cube with one more attribute
+                parent = next(p for p in cubes if len(p) == size + 1 and set(level) < set(p))
+                (parent_codes, parent_counts) = cubes[parent]
+                cubes[level] = roll_up(parent_codes, parent_counts, [parent.index(a) for a in level])
+                levels.append(level)
+    frames = []
+    for level in levels:
+        (codes, counts) = cubes[level]
+        keep = counts.sum(axis=(1, 2)) >= min_support
+        (codes, counts) = (codes[keep], counts[keep])
+        frame = {}
+        for (a, attribute) in enumerate(attributes):
+            frame[attribute] = [values[a][c] for c in codes[:, level.index(a)]] if a in level else [None] * len(codes)
+        frame['level'] = [','.join(attributes[a] for a in level)] * len(codes)
+        frame.update(_metric_rows(GroupConfusionCounts(list(range(len(codes))), counts)))
+        frames.append(pd.DataFrame(frame))
+    return pd.concat(frames, ignore_index=True)
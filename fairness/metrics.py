@@ -1,10 +1,16 @@
 
+import logging
 import pandas as pd
-from sklearn.metrics import confusion_matrix
 from collections import Counter
 from kafkanator.util import transform_dict_keys_to_str,default_row_highlighting
+from kafkanator.fairness.confusion import METRIC_ROWS, group_confusion_counts
+from kafkanator.fairness.cache import active_cache
+from kafkanator.columnar import read_columns
+from kafkanator.instrumentation import timed
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
 def statistical_parity_data(df,sensitive_attribute,predict_column,reality_column):
     """This method computes a table that summarizes predictions over sensitive attributes.
 
@@ -15,18 +21,31 @@ def statistical_parity_data(df,sensitive_attribute,predict_column,reality_column
     
     Returns:
         DataFrame : a dataframe whose rows are : < s1 , p1 , nb of predictions p1 > , < s1 , p2, nb of predictions p2 >  , ...
+        with every (sensitive value, prediction) combination, sorted by sensitive value then prediction. Rows with a null
+        sensitive value or prediction are not counted.
     """
-    df = df.drop(df[ df[ predict_column ].isnull()].index)
-    vals_sens_attribute = set(df[ sensitive_attribute ].values)
-    vals_predictions = set(df[ predict_column ].values)
-    bpdata = []
-    pred_order = []
-    for v in vals_sens_attribute : 
-        for p in vals_predictions:
-            num = df[(df[sensitive_attribute] == v) & (df[predict_column] == p)].shape
-            bpdata.append({'attr': v, 'prediction':p,'number': num[0] })
-            barplot_data = pd.DataFrame(data=bpdata,columns=['attr','prediction','number'])
-    return barplot_data
+    arrays = read_columns(df, [sensitive_attribute, predict_column])
+
+    def count():
+        # one bincount over (sensitive value, prediction) codes instead of one boolean filter per combination
+        attr_codes, attrs = pd.factorize(arrays[sensitive_attribute], sort=True)
+        pred_codes, preds = pd.factorize(arrays[predict_column], sort=True)
+        valid = (attr_codes >= 0) & (pred_codes >= 0)
+        number = np.bincount(attr_codes[valid] * len(preds) + pred_codes[valid], minlength=len(attrs) * len(preds))
+        return pd.DataFrame({'attr': np.repeat(np.asarray(attrs), len(preds)), 'prediction': np.tile(np.asarray(preds), len(attrs)),
+                             'number': number}, columns=['attr','prediction','number'])
+
+    cache = active_cache()
+    if cache is None:
+        return count()
+    return cache.get_or_compute(cache.key('prediction_counts', arrays), count).copy()
+
+def _per_model(counts, metric):
+    """This PRIVATE method applies metric on the counts, or on the counts of every model when several prediction columns were
+    given, the result is then a {model: metric result} dictionary."""
+    if counts.models is None:
+        return metric(counts)
+    return {name: metric(counts.model(m)) for (m, name) in enumerate(counts.models)}
 
 def statistical_parity(df,sensitive_attribute,predict_column,reality_column):
     """This method computes statistical parity on values of a specified sensitive attribute.
@@ -34,18 +53,13 @@ def statistical_parity(df,sensitive_attribute,predict_column,reality_column):
         df (pandas DataFrame): dataframe . It must contain one or more sensitive attribute columns S 
         containing {v1,v2,v3,...,vn} different sensitive attributes values, and one prediction column P containing a binary prediction {1,0}.
         sensitive_attribute (str): The column designing the sensitive attribute : sex, age, handicap, nationality etc.
-        predict_column (str): the column where dataframe df stores prediction.
+        predict_column (str or list): the column where dataframe df stores prediction, several columns give one result per model.
         reality_column (str): the column where dataframe df stores what happens in reality.
     Returns:
         {v1: p1, v2: p2} : a dictionary containing the P1 class per value in set of columns S  .
     """
-    groups = df.groupby(by=sensitive_attribute)
-    stock = {}
-    for (k,v) in groups :
-        totpos = sum(v[predict_column])
-        totalrows = v.shape[0]
-        stock[k] =  totpos / totalrows
-    return stock
+    counts = group_confusion_counts(df,sensitive_attribute,predict_column,reality_column)
+    return _per_model(counts, lambda c: c.to_dict(c.positive_rate()))
 
 def disparate_impact (df,sensitive_attribute,predict_column,reality_column):
     """This method computes disparate impact on values of a specified sensitive attribute.
@@ -53,18 +67,13 @@ def disparate_impact (df,sensitive_attribute,predict_column,reality_column):
         df (pandas DataFrame): dataframe . It must contain one or more sensitive attribute columns S 
         containing {v1,v2,v3,...,vn} different sensitive attributes values, and one prediction column P containing a binary prediction {1,0}.
         sensitive_attribute (str): The column designing the sensitive attribute : sex, age, handicap, nationality etc.
-        predict_column (str): the column where dataframe df stores prediction.
+        predict_column (str or list): the column where dataframe df stores prediction, several columns give one result per model.
         reality_column (str): the column where dataframe df stores what happens in reality.
     Returns:
         {v1: prev1, v2: prev2} : a dictionary containing the prevalence per value in set of columns S  .
     """
-    groups = df.groupby(by=sensitive_attribute)
-    stock = {}
-    for (k,v) in groups :
-        cm = confusion_matrix( v[reality_column] ,  v[predict_column] )
-        DI = (cm[1][1]  +  cm[1][0])/ (cm[0][0] + cm[0][1] + cm[1][0] + cm[1][1])
-        stock[k] =  DI
-    return stock
+    counts = group_confusion_counts(df,sensitive_attribute,predict_column,reality_column)
+    return _per_model(counts, lambda c: c.to_dict(c.prevalence()))
 
 def equal_opportunity(df,sensitive_attribute,predict_column,reality_column):
     """This method computes disparate impact on values of a specified sensitive attribute.
@@ -72,18 +81,13 @@ def equal_opportunity(df,sensitive_attribute,predict_column,reality_column):
         df (pandas DataFrame): dataframe . It must contain one or more sensitive attribute columns S 
         containing {v1,v2,v3,...,vn} different sensitive attributes values, and one prediction column P containing a binary prediction {1,0}.
         sensitive_attribute (str): The column designing the sensitive attribute : sex, age, handicap, nationality etc.
-        predict_column (str): the column where dataframe df stores prediction.
+        predict_column (str or list): the column where dataframe df stores prediction, several columns give one result per model.
         reality_column (str): the column where dataframe df stores what happens in reality.
     Returns:
         {v1: tpr1, v2: tpr2} : a dictionary containing the TPR per value in set of columns S  .
     """
-    dictret_tpr = {}
-    groups = df.groupby(by=sensitive_attribute)
-    for (k,v) in groups :
-        cm = confusion_matrix( v[reality_column] ,  v[predict_column] )
-        TPR = cm[1][1] / (cm[1][0] + cm[1][1])
-        dictret_tpr[k] = TPR
-    return dictret_tpr
+    counts = group_confusion_counts(df,sensitive_attribute,predict_column,reality_column)
+    return _per_model(counts, lambda c: c.to_dict(c.tpr()))
 
 def equalized_odds(df,sensitive_attribute,predict_column,reality_column):
     """This method computes disparate impact on values of a specified sensitive attribute.
@@ -91,19 +95,22 @@ def equalized_odds(df,sensitive_attribute,predict_column,reality_column):
         df (pandas DataFrame): dataframe . It must contain one or more sensitive attribute columns S 
         containing {v1,v2,v3,...,vn} different sensitive attributes values, and one prediction column P containing a binary prediction {1,0}.
         sensitive_attribute (str): The column designing the sensitive attribute : sex, age, handicap, nationality etc.
-        predict_column (str): the column where dataframe df stores prediction.
+        predict_column (str or list): the column where dataframe df stores prediction, several columns give one result per model.
         reality_column (str): the column where dataframe df stores what happens in reality.
     Returns:
         {v1: fpr1,tpr1, v2: fpr2,tpr2} : a dictionary containing the FPR,TPR per value in set of columns S  .
     """
-    ekodd = {}
-    groups = df.groupby(by=sensitive_attribute)
-    for (k,v) in groups :
-        cm = confusion_matrix( v[reality_column] ,  v[predict_column] )
-        FPR = cm[0][1] / (cm[0][1] + cm[0][0])
-        TPR = cm[1][1] / (cm[1][0] + cm[1][1])
-        ekodd[k] = str(FPR) + ',' + str(TPR)
-    return ekodd
+    counts = group_confusion_counts(df,sensitive_attribute,predict_column,reality_column)
+    return _per_model(counts, equalized_odds_from_counts)
+
+def equalized_odds_from_counts(counts):
+    """This method formats the equalized odds "FPR,TPR" strings from precomputed group counts.
+    Args:
+        counts (GroupConfusionCounts): the per group confusion counts.
+    Returns:
+        {v1: fpr1,tpr1, v2: fpr2,tpr2} : a dictionary containing the FPR,TPR per value in set of columns S  .
+    """
+    return counts.to_dict([str(fpr) + ',' + str(tpr) for (fpr,tpr) in zip(counts.fpr(),counts.tpr())])
 
 def predictive_parity(df,sensitive_attribute,predict_column,reality_column):
     """This method computes disparate impact on values of a specified sensitive attribute.
@@ -111,18 +118,13 @@ def predictive_parity(df,sensitive_attribute,predict_column,reality_column):
         df (pandas DataFrame): dataframe . It must contain one or more sensitive attribute columns S 
         containing {v1,v2,v3,...,vn} different sensitive attributes values, and one prediction column P containing a binary prediction {1,0}.
         sensitive_attribute (str): The column designing the sensitive attribute : sex, age, handicap, nationality etc.
-        predict_column (str): the column where dataframe df stores prediction.
+        predict_column (str or list): the column where dataframe df stores prediction, several columns give one result per model.
         reality_column (str): the column where dataframe df stores what happens in reality.
     Returns:
         {v1: ppv1, v2: ppv2} : a dictionary containing the FPR,TPR per value in set of columns S  .
     """
-    dictret_ppv = {}
-    groups = df.groupby(by=sensitive_attribute)
-    for (k,v) in groups :
-        cm = confusion_matrix( v[reality_column] ,  v[predict_column] )
-        ppv = cm[1][1] / (cm[1][1] + cm[0][1])
-        dictret_ppv[k] = ppv
-    return dictret_ppv
+    counts = group_confusion_counts(df,sensitive_attribute,predict_column,reality_column)
+    return _per_model(counts, lambda c: c.to_dict(c.ppv()))
 
 def fpr_fnr(df,sensitive_attribute,predict_column,reality_column):
     """This method computes false positive rate and false negative rate on subpopulations ( see <>HERE<> ).
@@ -130,29 +132,18 @@ def fpr_fnr(df,sensitive_attribute,predict_column,reality_column):
     Args:
         df (pandas DataFrame): dataframe . It must contain one sensitive attribute column S containing {s1,s2,s3,...,sn} different sensitive attributes values and one prediction column P containing a binary prediction {1,0}.
         sensitive_attribute (str): The column designing the sensitive attribute : sex, age, handicap, nationality etc.
-        predict_column (str): the column where dataframe df stores prediction.
+        predict_column (str or list): the column where dataframe df stores prediction, several columns give one result per model.
         reality_column (str): the column where dataframe df stores what happens in reality.
     Returns:
         (fpr,fnr) : a tuple containing in position 0 the false positive rate, and in position 1 the false negative rate.
     """
-    dictret_fpr = {}
-    dictret_fnr = {}
-    
-    for x in list(set(df[sensitive_attribute].values)):
-        dictret_fpr[x] = ''
-        dictret_fnr[x] = ''
-    groups = df.groupby(by=[sensitive_attribute])
-    
-    for (k,v) in groups :
-        cm = confusion_matrix( v[reality_column] ,  v[predict_column] )
-        FPR = cm[0][1] / (cm[0][1] + cm[0][0])
-        FNR = cm[1][0] / ( cm[1][0] + cm[1][1])
-        dictret_fpr[k[0]] = FPR
-        dictret_fnr[k[0]] = FNR
-    return dictret_fpr, dictret_fnr
+    counts = group_confusion_counts(df,sensitive_attribute,predict_column,reality_column)
+    return _per_model(counts, lambda c: (c.to_dict(c.fpr()), c.to_dict(c.fnr())))
 
 def build_last_column(df,label_last_column):
-    """This PRIVATE method compute last column of summarized fairness measure table.
+    """This PRIVATE method compute last column of summarized fairness measure table. Every row compares all the groups: the
+    max - min spread of the parity rows (the absolute difference with two groups), the element wise spread of the equalized
+    odds pairs, and the min / max ratio of the disparate impact prevalences. fairness_metrics_bootstrap(..) computes the same.
     Args:
         df (pandas DataFrame): dataframe . It must contain one or more sensitive attribute columns S 
     Returns:
@@ -162,25 +153,19 @@ def build_last_column(df,label_last_column):
     for i in range(0,df.shape[0]):
         ind = df.index[i]
         if (ind == 'DEMOGRAPHIC PARITY - P1') or (ind == 'EQUAL OPPORTUNITY - TPR') or (ind == 'PREDICTIVE PARITY - PPV'):
-            print ( ' first if ', str(len(df.columns)))
-            if len(df.columns) == 2:
-                d = abs(df.iloc[i,0] - df.iloc[i,1])
-                column.append(d)
-            elif len(df.columns) > 2:
-                d = max(df.iloc[i]) - min(df.iloc[i])
-                column.append(d)
+            logger.debug('%s row compares %d groups', ind, len(df.columns))
+            d = max(df.iloc[i]) - min(df.iloc[i])
+            column.append(d)
         elif ind == 'EQUALIZED ODDS - (TPR,FPR)':
-            print ( ' second if ')
-            tu1 = [float(x) for x in df.iloc[i,0].split(',')]
-            tu2 =[float(x) for x in df.iloc[i,1].split(',')]
-            tu = np.subtract ( tu1 ,tu2) 
-            tupled = tuple(np.absolute(tu))
+            logger.debug('%s row compares %d groups', ind, len(df.columns))
+            tuples = np.array([[float(x) for x in value.split(',')] for value in df.iloc[i]])
+            tupled = tuple(tuples.max(axis=0) - tuples.min(axis=0))
             column.append(','.join([str(x) for x in tupled]))
         elif ind == 'DISPARATE IMPACT - PREVALENCE':
-            print ( ' third if ')
-            d = (df.iloc[i,0] /  df.iloc[i,1]) if df.iloc[i,0] < df.iloc[i,1] else  (df.iloc[i,1] / df.iloc[i,0])
+            logger.debug('%s row compares %d groups', ind, len(df.columns))
+            d = min(df.iloc[i]) / max(df.iloc[i])
             column.append(d)
-    print ( 'retriv column with len ',len(column))
+    logger.debug('last column %s has %d values', label_last_column, len(column))
     return column
 
 def fairness_metrics_table(dataset,sensitive_attribute,predict_column,reality_column,aggregate_metrics=False,function_last_column=None,label_last_column='DELTA'):
@@ -189,40 +174,62 @@ def fairness_metrics_table(dataset,sensitive_attribute,predict_column,reality_co
         dataset (pandas DataFrame): dataframe . It must contain one or more sensitive attribute columns S 
         containing {v1,v2,v3,...,vn} different sensitive attributes values, and one prediction column P containing a binary prediction {1,0}.
         sensitive_attribute (str): The column designing the sensitive attribute : sex, age, handicap, nationality etc.
-        predict_column (str): the column where dataframe df stores prediction.
+        predict_column (str, list or numpy array): the column where dataframe df stores prediction, or several prediction columns.
         reality_column (str): the column where dataframe df stores what happens in reality.
     Returns:
-        DataFrame : a dataframe summarizing fairness measures .
+        DataFrame : a dataframe summarizing fairness measures . With several prediction columns (a list of columns or a
+        (rows, models) matrix as predict_column, see group_confusion_counts(..)) the tables of every model are side by side,
+        under (model, group) columns.
     """
+    with timed(logger, 'fairness_metrics_table.counts') as span:
+        counts = group_confusion_counts(dataset,sensitive_attribute,predict_column,reality_column)
+        span['rows'] = int(np.sum(counts.n if counts.models is None else counts.n[0]))
+        span['groups'] = len(counts.keys)
+        span['models'] = 1 if counts.models is None else len(counts.models)
+    return fairness_metrics_table_from_counts(counts,aggregate_metrics,function_last_column,label_last_column)
+
+def fairness_metrics_table_from_counts(counts,aggregate_metrics=False,function_last_column=None,label_last_column='DELTA'):
+    """This method builds the fairness measures summary table from precomputed group confusion counts, every metric is derived
+    from the same counts so the data is scanned only once.
+    Args:
+        counts (GroupConfusionCounts): the per group confusion counts, see group_confusion_counts(..). Group keys must be tuples,
+        that is the counts must come from a list of sensitive attribute columns.
+        aggregate_metrics (boolean): True to add the last column comparing groups.
+        function_last_column (list, optional): precomputed last column, if None build_last_column(..) is used.
+        label_last_column (str): label of the last column.
+    Returns:
+        DataFrame : a dataframe summarizing fairness measures , with (model, group) columns for multi model counts.
+    """
+    if counts.models is not None:
+        tables = [fairness_metrics_table_from_counts(counts.model(m),aggregate_metrics,function_last_column,label_last_column) for m in range(len(counts.models))]
+        return pd.concat(tables, axis=1, keys=counts.models, names=['model', None])
     colormap = []
-    indices = ['DEMOGRAPHIC PARITY - P1','EQUAL OPPORTUNITY - TPR','PREDICTIVE PARITY - PPV','DISPARATE IMPACT - PREVALENCE']
-    (sp,eo,pp,eodd,di) = (statistical_parity(dataset,sensitive_attribute,predict_column,reality_column) , 
-    equal_opportunity(dataset,sensitive_attribute,predict_column,reality_column),
-    predictive_parity(dataset,sensitive_attribute,predict_column,reality_column),
-    equalized_odds(dataset,sensitive_attribute,predict_column,reality_column),
-    disparate_impact(dataset,sensitive_attribute,predict_column,reality_column))
-    sp_strkeys = transform_dict_keys_to_str(sp)
-    print ('ks ', sp_strkeys)
-    lcols = list(sp_strkeys.keys())
-    print ( ' lcosl ', lcols)
-    df = pd.DataFrame(index=indices,columns=lcols)
-    print ('sta party output ',sp)
-    for (k,v) in sp_strkeys.items():
-        df.loc['DEMOGRAPHIC PARITY - P1',k] = sp_strkeys[k]
-    eo_strkeys = transform_dict_keys_to_str(eo)
-    for (k,v) in eo_strkeys.items():
-        df.loc['EQUAL OPPORTUNITY - TPR',k] = eo_strkeys[k]
-    pp_strkeys = transform_dict_keys_to_str(pp)
-    for (k,v) in pp_strkeys.items():
-        df.loc['PREDICTIVE PARITY - PPV',k] = pp_strkeys[k]
-    di_strkeys = transform_dict_keys_to_str(di)
-    for (k,v) in di_strkeys.items():
-        df.loc['DISPARATE IMPACT - PREVALENCE',k] = di_strkeys[k]
-    colormap = []
-    if aggregate_metrics == True :
-        assert(label_last_column!=None)
-        if function_last_column != None : 
-            df[label_last_column] =  function_last_column 
-        else:
-            df[label_last_column] = build_last_column(df,label_last_column)
+    with timed(logger, 'fairness_metrics_table.table', groups=len(counts.keys), aggregate_metrics=bool(aggregate_metrics)):
+        (sp,eo,pp,eodd,di) = (counts.to_dict(counts.positive_rate()),
+        counts.to_dict(counts.tpr()),
+        counts.to_dict(counts.ppv()),
+        equalized_odds_from_counts(counts),
+        counts.to_dict(counts.prevalence()))
+        sp_strkeys = transform_dict_keys_to_str(sp)
+        lcols = list(sp_strkeys.keys())
+        logger.debug('fairness table groups %s', lcols)
+        df = pd.DataFrame(index=METRIC_ROWS,columns=lcols)
+        for (k,v) in sp_strkeys.items():
+            df.loc['DEMOGRAPHIC PARITY - P1',k] = sp_strkeys[k]
+        eo_strkeys = transform_dict_keys_to_str(eo)
+        for (k,v) in eo_strkeys.items():
+            df.loc['EQUAL OPPORTUNITY - TPR',k] = eo_strkeys[k]
+        pp_strkeys = transform_dict_keys_to_str(pp)
+        for (k,v) in pp_strkeys.items():
+            df.loc['PREDICTIVE PARITY - PPV',k] = pp_strkeys[k]
+        di_strkeys = transform_dict_keys_to_str(di)
+        for (k,v) in di_strkeys.items():
+            df.loc['DISPARATE IMPACT - PREVALENCE',k] = di_strkeys[k]
+        colormap = []
+        if aggregate_metrics == True :
+            assert(label_last_column!=None)
+            if function_last_column != None : 
+                df[label_last_column] =  function_last_column 
+            else:
+                df[label_last_column] = build_last_column(df,label_last_column)
     return df
\ No newline at end of file
@@ -0,0 +1,94 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.confusion import GroupConfusionCounts, group_codes, confusion_counts_from_codes
+from kafkanator.fairness.metrics import fairness_metrics_table_from_counts
+
+class FairnessMonitor:
+    """Incremental group fairness metrics over a stream of scored mini batches.
+
+    The monitor keeps the TN, FP, FN, TP counters of every sensitive group for the current window, and the counts of every
+    batch of the window so expired batches can be subtracted. table() then costs O(#groups) whatever the number of rows seen.
+
+    Examples:
+        >>> monitor = FairnessMonitor(window=24)
+        >>> monitor.update(batch['sex'], batch['prediction'], batch['reality'])
+        >>> monitor.table(aggregate_metrics=True)
+
+    Args:
+        window (int, optional): number of batches kept, None keeps every batch until evict_before(..) is called.
+        mode (str): 'sliding' drops the oldest batch when a new one exceeds the window, 'tumbling' starts an empty window
+        once the current one holds window batches.
+    """
+
+    def __init__(self, window=None, mode='sliding'):
+        if mode not in ('sliding', 'tumbling'):
+            raise ValueError('mode must be sliding or tumbling')
+        self.window = window
+        self.mode = mode
+        self._keys = []
+        self._positions = {}
+        self._totals = np.zeros((0, 2, 2), dtype=np.int64)
+        self._batches = deque()
+
+    def _positions_of(self, keys):
+        for k in keys:
+            if k not in self._positions:
+                self._positions[k] = len(self._keys)
+                self._keys.append(k)
+        if len(self._keys) > self._totals.shape[0]:
+            grown = np.zeros((len(self._keys), 2, 2), dtype=np.int64)
+            grown[:self._totals.shape[0]] = self._totals
+            self._totals = grown
+        return np.array([self._positions[k] for k in keys], dtype=np.int64)
+
+    def update(self, sensitive, prediction, reality, timestamp=None):
+        """Adds a mini batch of scored rows.
+
+        Args:
+            sensitive (array like): sensitive attribute value of every row, or a (rows, attributes) array / DataFrame for
+            several sensitive attributes.
+            prediction (array like): binary {1,0} predictions.
+            reality (array like): binary {1,0} realities.
+            timestamp (optional): batch timestamp, used by evict_before(..).
+        Returns:
+            FairnessMonitor : self.
+        """
+        sensitive = pd.DataFrame(sensitive) if np.ndim(sensitive) == 2 else pd.DataFrame({0: np.asarray(sensitive)})
+        codes, keys = group_codes(sensitive, list(sensitive.columns))
+        batch = confusion_counts_from_codes(codes, keys, prediction, reality)
+        if self.window is not None and len(self._batches) >= self.window:
+            if self.mode == 'tumbling':
+                self.evict(len(self._batches))
+            else:
+                self.evict(len(self._batches) - self.window + 1)
+        positions = self._positions_of(batch.keys)
+        self._totals[positions] += batch.counts
+        self._batches.append((timestamp, positions, batch.counts))
+        return self
+
+    def evict(self, n=1):
+        """Subtracts the n oldest batches from the window. Returns self."""
+        for _ in range(min(n, len(self._batches))):
+            (_, positions, counts) = self._batches.popleft()
+            self._totals[positions] -= counts
+        return self
+
+    def evict_before(self, timestamp):
+        """Subtracts every batch whose timestamp is lower than timestamp. Returns self."""
+        while len(self._batches) > 0 and self._batches[0][0] is not None and self._batches[0][0] < timestamp:
+            self.evict(1)
+        return self
+
+    def counts(self):
+        """Returns the GroupConfusionCounts of the current window, groups sorted like groupby, groups without rows are left out."""
+        present = [p for p in range(len(self._keys)) if self._totals[p].sum() > 0]
+        try:
+            present.sort(key=lambda p: self._keys[p])
+        except TypeError:
+            pass
+        return GroupConfusionCounts([self._keys[p] for p in present], self._totals[present])
+
+    def table(self, aggregate_metrics=False, function_last_column=None, label_last_column='DELTA'):
+        """Returns the fairness_metrics_table(..) of the rows of the current window, see fairness_metrics_table_from_counts(..)."""
+        return fairness_metrics_table_from_counts(self.counts(), aggregate_metrics, function_last_column, label_last_column)
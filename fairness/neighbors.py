@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.pairwise import _columns_of_type, _null_codes
+
+def _numeric_matrix(data, columns):
+    """This PRIVATE method stacks the numerical columns, int64 if all of them are integer and float64 otherwise."""
+    integer_num = all(pd.api.types.is_integer_dtype(data[col]) for col in columns)
+    return np.asarray(data[columns].values, dtype=np.int64 if integer_num else np.float64).reshape(len(data), len(columns))
+
+class SimmilarityIndex:
+    """Nearest neighbour index under the categorical_simmilarity_distance(..) metric: number of different 'cat' columns
+    plus L1 distance on the 'num' columns.
+
+    Indexed rows are blocked by their exact categorical signature. A query visits blocks by increasing Hamming distance
+    (a lower bound of the full distance) and stops once that bound exceeds the current k-th neighbour or the radius. Inside
+    a block rows are sorted by the first numerical column, so only the rows with |x0 - q0| lower or equal to the remaining
+    distance budget are compared.
+
+    Examples:
+        >>> index = SimmilarityIndex(males, {'race':'cat','age':'num','priors_count':'num','score':'target'})
+        >>> (neighbours, distances) = index.knn(females, k=5)
+
+    Args:
+        data (pandas DataFrame): the individuals to index, they are referred by row position.
+        simmilarity_attr_hsh (dict): column -> 'cat', 'num' or 'target', see categorical_simmilarity_distance(..). The target
+        column is optional, it is only needed by the different_treatment filter.
+    """
+
+    def __init__(self, data, simmilarity_attr_hsh):
+        self.cat_columns = _columns_of_type(simmilarity_attr_hsh, 'cat')
+        self.num_columns = _columns_of_type(simmilarity_attr_hsh, 'num')
+        target_columns = _columns_of_type(simmilarity_attr_hsh, 'target')
+        self.target_column = target_columns[-1] if len(target_columns) > 0 else None
+        if len(self.cat_columns) + len(self.num_columns) == 0:
+            raise ValueError('NO COLUMNS')
+        self.size = len(data)
+        self._vocabularies = {}
+        cat = np.zeros((len(data), len(self.cat_columns)), dtype=np.int64)
+        for (c, col) in enumerate(self.cat_columns):
+            cat[:, c] = self._encode_index_column(data[col], col)
+        num = _numeric_matrix(data, self.num_columns)
+        self._dist_dtype = num.dtype
+        target = self._encode_index_column(data[self.target_column], self.target_column) if self.target_column is not None else np.zeros(len(data), dtype=np.int64)
+        # block b holds the rows whose categorical codes are self.signatures[b], sorted by the first numerical column
+        self.signatures, block_of_row = np.unique(cat, axis=0, return_inverse=True)
+        block_of_row = block_of_row.reshape(-1)
+        if num.shape[1] > 0:
+            order = np.lexsort((num[:, 0], block_of_row))
+        else:
+            order = np.argsort(block_of_row, kind='stable')
+        bounds = np.searchsorted(block_of_row[order], np.arange(len(self.signatures) + 1))
+        self._rows = [order[bounds[b]:bounds[b + 1]] for b in range(len(self.signatures))]
+        self._num = [num[rows] for rows in self._rows]
+        self._target = [target[rows] for rows in self._rows]
+
+    def __len__(self):
+        return self.size
+
+    def _encode_index_column(self, values, column):
+        codes, uniques = pd.factorize(values)
+        self._vocabularies[column] = pd.Index(uniques)
+        # None matches a query None (code len(uniques)), nan never matches, query side unknown values are -1
+        return _null_codes(values, codes.astype(np.int64), len(uniques), -2)
+
+    def _encode_query_column(self, values, column):
+        vocabulary = self._vocabularies[column]
+        return _null_codes(values, vocabulary.get_indexer(values).astype(np.int64), len(vocabulary), -1)
+
+    def _encode_query(self, queries):
+        cat = np.zeros((len(queries), len(self.cat_columns)), dtype=np.int64)
+        for (c, col) in enumerate(self.cat_columns):
+            cat[:, c] = self._encode_query_column(queries[col], col)
+        num = _numeric_matrix(queries, self.num_columns)
+        if self.target_column is not None and self.target_column in queries:
+            target = self._encode_query_column(queries[self.target_column], self.target_column)
+        else:
+            target = None
+        return cat, num, target
+
+    def _block_distances(self, b, hamming, q_num, budget, q_target, different_treatment):
+        """This PRIVATE method returns (rows, distances) of block b that are within hamming + budget of the query."""
+        rows, num = self._rows[b], self._num[b]
+        if num.shape[1] > 0 and np.isfinite(budget):
+            lo = np.searchsorted(num[:, 0], q_num[0] - budget, side='left')
+            hi = np.searchsorted(num[:, 0], q_num[0] + budget, side='right')
+        else:
+            (lo, hi) = (0, len(rows))
+        dist = np.abs(num[lo:hi] - q_num).sum(axis=1) + hamming
+        rows = rows[lo:hi]
+        if different_treatment is not None:
+            keep = (self._target[b][lo:hi] == q_target) != different_treatment
+            (rows, dist) = (rows[keep], dist[keep])
+        return rows, dist
+
+    def _check_filter(self, target, different_treatment):
+        if different_treatment is not None and target is None:
+            raise ValueError('different_treatment needs the target column on both the index and the queries')
+
+    def knn(self, queries, k, different_treatment=None):
+        """This method finds the k most simmilar indexed individuals of every query row.
+
+        Args:
+            queries (pandas DataFrame): individuals to look up, with the same 'cat' and 'num' columns.
+            k (int): number of neighbours.
+            different_treatment (boolean, optional): True keeps only neighbours with a different target, False only neighbours
+            with the same target.
+        Returns:
+            tuple : (neighbours, distances), two lists with one array per query row, sorted by ascending distance then by
+            indexed row position. Arrays are shorter than k if the index has fewer eligible rows.
+        """
+        return self._knn(self._encode_query(queries), k, different_treatment)
+
+    def _knn(self, encoded, k, different_treatment):
+        """This PRIVATE method is knn(..) on queries already encoded by _encode_query(..)."""
+        cat, num, target = encoded
+        self._check_filter(target, different_treatment)
+        neighbours, distances = [], []
+        for i in range(len(cat)):
+            hamming = (self.signatures != cat[i]).sum(axis=1)
+            best_rows = np.empty(0, dtype=np.int64)
+            best_dist = np.empty(0, dtype=self._dist_dtype)
+            bound = np.inf
+            q_target = target[i] if target is not None else None
+            for b in np.argsort(hamming, kind='stable'):
+                h = hamming[b]
+                if h > bound:
+                    break
+                if num.shape[1] > 0 and not np.isfinite(bound) and len(self._rows[b]) + len(best_rows) >= k:
+                    # seed a finite bound from the rows closest on the first numerical column
+                    pos = np.searchsorted(self._num[b][:, 0], num[i, 0])
+                    window = slice(max(0, pos - k), pos + k)
+                    seed = np.abs(self._num[b][window] - num[i]).sum(axis=1) + h
+                    if different_treatment is not None:
+                        seed = seed[(self._target[b][window] == q_target) != different_treatment]
+                    candidates = np.concatenate((best_dist, seed))
+                    if len(candidates) >= k:
+                        bound = np.partition(candidates, k - 1)[k - 1]
+                rows, dist = self._block_distances(b, h, num[i], bound - h, q_target, different_treatment)
+                best_rows = np.concatenate((best_rows, rows))
+                best_dist = np.concatenate((best_dist, dist))
+                order = np.lexsort((best_rows, best_dist))[:k]
+                (best_rows, best_dist) = (best_rows[order], best_dist[order])
+                if len(best_rows) == k:
+                    bound = best_dist[-1]
+            neighbours.append(best_rows)
+            distances.append(best_dist)
+        return neighbours, distances
+
+    def radius(self, queries, radius, different_treatment=None):
+        """This method finds, for every query row, the indexed individuals whose distance is lower or equal to radius.
+
+        Args:
+            queries (pandas DataFrame): individuals to look up, with the same 'cat' and 'num' columns.
+            radius (float): maximum distance.
+            different_treatment (boolean, optional): True keeps only neighbours with a different target, False only neighbours
+            with the same target.
+        Returns:
+            tuple : (neighbours, distances), two lists with one array per query row, sorted by ascending distance then by
+            indexed row position.
+        """
+        return self._radius(self._encode_query(queries), radius, different_treatment)
+
+    def _radius(self, encoded, radius, different_treatment):
+        """This PRIVATE method is radius(..) on queries already encoded by _encode_query(..)."""
+        cat, num, target = encoded
+        self._check_filter(target, different_treatment)
+        neighbours, distances = [], []
+        for i in range(len(cat)):
+            hamming = (self.signatures != cat[i]).sum(axis=1)
+            q_target = target[i] if target is not None else None
+            found_rows, found_dist = [], []
+            for b in np.nonzero(hamming <= radius)[0]:
+                rows, dist = self._block_distances(b, hamming[b], num[i], radius - hamming[b], q_target, different_treatment)
+                within = dist <= radius
+                found_rows.append(rows[within])
+                found_dist.append(dist[within])
+            rows = np.concatenate(found_rows) if len(found_rows) > 0 else np.empty(0, dtype=np.int64)
+            dist = np.concatenate(found_dist) if len(found_dist) > 0 else np.empty(0, dtype=self._dist_dtype)
+            order = np.lexsort((rows, dist))
+            neighbours.append(rows[order])
+            distances.append(dist[order])
+        return neighbours, distances
+
+    def query_pairs(self, queries, k=None, radius=None, different_treatment=None):
+        """This method runs knn(..) or radius(..) and returns the result with the simmilarity_fairness_hash(..) layout.
+
+        Args:
+            queries (pandas DataFrame): individuals to look up, their targets are compared to the indexed ones.
+            k (int, optional): number of neighbours per query row.
+            radius (float, optional): maximum distance, used when k is None.
+            different_treatment (boolean, optional): see knn(..).
+        Returns:
+            list : [((i,j),(distance,samePrediction)), ...] sorted by ascending distance then by (i,j), i is the query row
+            position and j the indexed row position.
+        """
+        encoded = self._encode_query(queries)
+        if k is not None:
+            neighbours, distances = self._knn(encoded, k, different_treatment)
+        elif radius is not None:
+            neighbours, distances = self._radius(encoded, radius, different_treatment)
+        else:
+            raise ValueError('query_pairs needs k or radius')
+        target = encoded[2]
+        target_of_row = np.zeros(self.size, dtype=np.int64)
+        for (rows, t) in zip(self._rows, self._target):
+            target_of_row[rows] = t
+        pairs = []
+        for (i, (rows, dist)) in enumerate(zip(neighbours, distances)):
+            same = (target_of_row[rows] == target[i]).tolist() if target is not None else [None] * len(rows)
+            pairs.extend(zip(zip([i] * len(rows), rows.tolist()), zip(dist.tolist(), same)))
+        pairs.sort(key=lambda row: (row[1][0], row[0]))
+        return pairs
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+# Upper bound on the number of (left row, right row) cells computed at once by pairwise_distance_blocks(..).
+DEFAULT_MAX_BLOCK_CELLS = 4000000
+
+def _columns_of_type(simmilarity_attr_hsh, attr_type):
+    return [k for (k,v) in simmilarity_attr_hsh.items() if v == attr_type]
+
+def _null_codes(values, codes, none_code, nan_code):
+    """This PRIVATE method recodes the values pd.factorize(..) or get_indexer(..) left at a negative code the way the row wise
+    distance compares them: None == None is True so None gets none_code on both sides, nan == nan is False so the other
+    nulls (and unknown values) get nan_code, a code of their own side only."""
+    missing = np.flatnonzero(codes < 0)
+    if len(missing) > 0:
+        values = np.asarray(values)
+        is_none = np.array([values[i] is None for i in missing], dtype=bool)
+        codes[missing] = np.where(is_none, none_code, nan_code)
+    return codes
+
+def _shared_codes(left_values, right_values):
+    """This PRIVATE method factorizes two columns with a shared vocabulary so codes are comparable across them, nulls are
+    coded by _null_codes(..): None matches None, nan never matches anything."""
+    codes, uniques = pd.factorize(pd.concat([pd.Series(left_values), pd.Series(right_values)], ignore_index=True))
+    left_codes = _null_codes(left_values, codes[:len(left_values)].astype(np.int64), len(uniques), -1)
+    right_codes = _null_codes(right_values, codes[len(left_values):].astype(np.int64), len(uniques), -2)
+    return left_codes, right_codes
+
+def encode_simmilarity_columns(left, right, simmilarity_attr_hsh):
+    """This method encodes the columns used by categorical_simmilarity_distance(..) into numpy arrays, once for every row.
+
+    Args:
+        left (pandas DataFrame): rows of the first sensitive group.
+        right (pandas DataFrame): rows of the second sensitive group.
+        simmilarity_attr_hsh (dict): column -> 'cat', 'num' or 'target', see categorical_simmilarity_distance(..).
+    Returns:
+        tuple : ((cat,num,target) of left, (cat,num,target) of right). cat is an int64 (rows, #cat columns) code matrix,
+        num a (rows, #num columns) matrix, int64 if every numerical column is integer and float64 otherwise, and target
+        the int64 codes of the target column.
+    """
+    cat_columns = _columns_of_type(simmilarity_attr_hsh, 'cat')
+    num_columns = _columns_of_type(simmilarity_attr_hsh, 'num')
+    target_columns = _columns_of_type(simmilarity_attr_hsh, 'target')
+    if len(target_columns) == 0:
+        raise ValueError('You must put a target')
+    if len(cat_columns) + len(num_columns) == 0:
+        raise ValueError('NO COLUMNS')
+    cat_left = np.zeros((len(left), len(cat_columns)), dtype=np.int64)
+    cat_right = np.zeros((len(right), len(cat_columns)), dtype=np.int64)
+    for (c, col) in enumerate(cat_columns):
+        cat_left[:, c], cat_right[:, c] = _shared_codes(left[col].values, right[col].values)
+    integer_num = all(pd.api.types.is_integer_dtype(left[col]) and pd.api.types.is_integer_dtype(right[col]) for col in num_columns)
+    num_dtype = np.int64 if integer_num else np.float64
+    num_left = np.asarray(left[num_columns].values, dtype=num_dtype).reshape(len(left), len(num_columns))
+    num_right = np.asarray(right[num_columns].values, dtype=num_dtype).reshape(len(right), len(num_columns))
+    # As on the row wise distance, the last target column is the one deciding samePrediction.
+    target_left, target_right = _shared_codes(left[target_columns[-1]].values, right[target_columns[-1]].values)
+    return (cat_left, num_left, target_left), (cat_right, num_right, target_right)
+
+def block_distances(cat_left, num_left, cat_right, num_right):
+    """This method computes the distance matrix between two blocks of encoded rows: the number of different categorical
+    columns plus the sum of absolute numerical differences.
+
+    Returns:
+        numpy array : a (left rows, right rows) distance matrix.
+    """
+    dist = np.zeros((cat_left.shape[0], cat_right.shape[0]), dtype=num_left.dtype)
+    for c in range(cat_left.shape[1]):
+        dist += cat_left[:, c, None] != cat_right[None, :, c]
+    for c in range(num_left.shape[1]):
+        dist += np.abs(num_left[:, c, None] - num_right[None, :, c])
+    return dist
+
+def pairwise_distance_blocks(left, right, simmilarity_attr_hsh, block_size=None):
+    """This method computes the categorical/numerical simmilarity distance between every row of left and every row of right,
+    tile by tile so memory stays bounded by block_size * len(right) cells.
+
+    Args:
+        left (pandas DataFrame): rows of the first sensitive group.
+        right (pandas DataFrame): rows of the second sensitive group.
+        simmilarity_attr_hsh (dict): column -> 'cat', 'num' or 'target', see categorical_simmilarity_distance(..).
+        block_size (int, optional): number of left rows per tile, by default computed from DEFAULT_MAX_BLOCK_CELLS.
+    Yields:
+        tuple : (start, distances, samePrediction), distances and samePrediction are (tile rows, len(right)) arrays whose
+        row r corresponds to left row start + r.
+    """
+    (cat_left, num_left, target_left), (cat_right, num_right, target_right) = encode_simmilarity_columns(left, right, simmilarity_attr_hsh)
+    if block_size is None:
+        block_size = max(1, DEFAULT_MAX_BLOCK_CELLS // max(1, len(right)))
+    for start in range(0, len(left), block_size):
+        stop = min(start + block_size, len(left))
+        dist = block_distances(cat_left[start:stop], num_left[start:stop], cat_right, num_right)
+        same = target_left[start:stop, None] == target_right[None, :]
+        yield start, dist, same
+
+def _keep_smallest(distances, flat_positions, same, top_k):
+    """This PRIVATE method keeps the top_k smallest distances, ties broken by flat (i,j) position like a stable full sort."""
+    if len(distances) > top_k:
+        kth = np.partition(distances, top_k - 1)[top_k - 1]
+        candidates = distances <= kth
+        distances, flat_positions, same = distances[candidates], flat_positions[candidates], same[candidates]
+    order = np.lexsort((flat_positions, distances))[:top_k]
+    return distances[order], flat_positions[order], same[order]
+
+def nearest_pairs(left, right, simmilarity_attr_hsh, max_distance=None, top_k=None, different_treatment=None, block_size=None):
+    """This method streams the pairwise distance tiles and keeps only the pairs a simmilarity audit looks at, so memory
+    grows with the result size and not with len(left) * len(right).
+
+    Args:
+        left (pandas DataFrame): rows of the first sensitive group.
+        right (pandas DataFrame): rows of the second sensitive group.
+        simmilarity_attr_hsh (dict): column -> 'cat', 'num' or 'target', see categorical_simmilarity_distance(..).
+        max_distance (float, optional): keep only pairs whose distance is lower or equal to max_distance.
+        top_k (int, optional): keep only the top_k closest pairs, a bounded candidate set is merged tile after tile.
+        different_treatment (boolean, optional): True keeps only pairs with different predictions, False only pairs with the
+        same prediction, None keeps both.
+        block_size (int, optional): number of left rows per tile.
+    Returns:
+        list : [((i,j),(distance,samePrediction)), ...] sorted by ascending distance then by (i,j), i and j are row positions
+        inside left and right.
+    """
+    if top_k is not None and top_k <= 0:
+        return []
+    width = len(right)
+    kept_dist, kept_pos, kept_same = [], [], []
+    for (start, dist, same) in pairwise_distance_blocks(left, right, simmilarity_attr_hsh, block_size):
+        mask = np.ones(dist.shape, dtype=bool)
+        if max_distance is not None:
+            mask &= dist <= max_distance
+        if different_treatment is not None:
+            mask &= same != different_treatment
+        rows, cols = np.nonzero(mask)
+        kept_dist.append(dist[rows, cols])
+        kept_pos.append((rows + start).astype(np.int64) * width + cols)
+        kept_same.append(same[rows, cols])
+        if top_k is not None:
+            merged = _keep_smallest(np.concatenate(kept_dist), np.concatenate(kept_pos), np.concatenate(kept_same), top_k)
+            kept_dist, kept_pos, kept_same = [merged[0]], [merged[1]], [merged[2]]
+    if len(kept_dist) == 0:
+        return []
+    distances, positions, same = np.concatenate(kept_dist), np.concatenate(kept_pos), np.concatenate(kept_same)
+    order = np.lexsort((positions, distances))
+    rows, cols = np.divmod(positions[order], width)
+    return list(zip(zip(rows.tolist(), cols.tolist()), zip(distances[order].tolist(), same[order].tolist())))
@@ -1,3 +1,12 @@
+import heapq
+import logging
+import numpy as np
+from kafkanator.fairness.pairwise import pairwise_distance_blocks, nearest_pairs
+from kafkanator.fairness.neighbors import SimmilarityIndex
+from kafkanator.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
 
 
 def categorical_simmilarity_distance(ind1,ind2,customized_attr_types):
@@ -18,22 +27,92 @@ def categorical_simmilarity_distance(ind1,ind2,customized_attr_types):
         assert('NO COLUMNS')
     return hashDistance,samePrediction
 
-def simmilarity_fairness_hash( data, sensitive_column, sensitive_attribute_values ,simmilarity_attr_hsh ,numrows,simmilarity_distance='catnum_simmilarity_distance'  ):
-    wo = data[ data[sensitive_column] == sensitive_attribute_values[0]].reset_index()
-    wo = wo.drop(['index'],axis=1)
-    ma = data[ data[sensitive_column] == sensitive_attribute_values[1]].reset_index()
-    ma = ma.drop(['index'],axis=1)
+def _sensitive_groups(data, sensitive_column, sensitive_attribute_values, numrows, simmilarity_distance):
+    """This PRIVATE method splits data into the two compared sensitive groups, keeping the first numrows rows of each."""
+    if simmilarity_distance != 'catnum_simmilarity_distance':
+        raise ValueError('unknown simmilarity distance ' + str(simmilarity_distance))
     # For the moment, only 2 values in sensitive_attribute_values allowed. if more than 2 we have to do like the correlation plots
-    hDict = {}
-    for i,w in wo.iloc[0:numrows].iterrows():
-        if i % 100 == 0:
-            print ( 'Analyzing row ' , i)
-        for j,h in ma.iloc[0:numrows].iterrows():
-            if simmilarity_distance == 'catnum_simmilarity_distance':
-                reto = categorical_simmilarity_distance(w,h,simmilarity_attr_hsh)
-            #print ( ' i ', i,' j ', j , ' reto ', reto ,  ' fnlwgt W ' , w['fnlwgt'] , ' fnlwgt H ' , h['fnlwgt'] )
-            d = sum(reto[0].values())
-            hDict[(i,j)] = (d,reto[1])
-    
-    sor = sorted(hDict.items(), key=lambda row: row[1][0], reverse=False)
-    return sor
\ No newline at end of file
+    wo = data[ data[sensitive_column] == sensitive_attribute_values[0]].reset_index(drop=True)
+    ma = data[ data[sensitive_column] == sensitive_attribute_values[1]].reset_index(drop=True)
+    return wo.iloc[0:numrows], ma.iloc[0:numrows]
+
+def _pair_distance(pair):
+    """This PRIVATE method returns the distance of a ((i,j),(distance,samePrediction)) pair."""
+    return pair[1][0]
+
+def simmilarity_fairness_hash( data, sensitive_column, sensitive_attribute_values ,simmilarity_attr_hsh ,numrows=None,simmilarity_distance='catnum_simmilarity_distance', block_size=None ):
+    """This method computes the simmilarity distance between every individual of one sensitive group and every individual of the other one.
+
+    Args:
+        data (pandas DataFrame): dataframe containing the sensitive column and the columns of simmilarity_attr_hsh.
+        sensitive_column (str): the sensitive column.
+        sensitive_attribute_values (list): the TWO sensitive values to compare.
+        simmilarity_attr_hsh (dict): column -> 'cat', 'num' or 'target', see categorical_simmilarity_distance(..).
+        numrows (int, optional): only the first numrows individuals of each group are compared, None compares every row.
+        simmilarity_distance (str): only catnum_simmilarity_distance for the moment.
+        block_size (int, optional): rows of the first group per distance tile, see pairwise_distance_blocks(..). Tiles are sorted
+        and turned into pairs one at a time, then merged, no distance matrix of every pair is allocated.
+    Returns:
+        list : [((i,j),(distance,samePrediction)), ...] sorted by ascending distance, i and j are row positions inside each group.
+    """
+    (wo, ma) = _sensitive_groups(data, sensitive_column, sensitive_attribute_values, numrows, simmilarity_distance)
+    if len(wo) == 0 or len(ma) == 0:
+        return []
+    runs = []
+    with timed(logger, 'simmilarity_fairness_hash.distances', rows=len(wo) + len(ma), pairs=len(wo) * len(ma)):
+        for (start, dist, same) in pairwise_distance_blocks(wo, ma, simmilarity_attr_hsh, block_size):
+            # every tile is sorted on its own, stable sort keeps the (i,j) row major order between ties
+            order = np.argsort(dist, axis=None, kind='stable')
+            rows, cols = np.divmod(order, len(ma))
+            runs.append(list(zip(zip((rows + start).tolist(), cols.tolist()), zip(dist.ravel()[order].tolist(), same.ravel()[order].tolist()))))
+    with timed(logger, 'simmilarity_fairness_hash.sort', pairs=len(wo) * len(ma)):
+        # tiles come in row order and merge keeps the first run on ties, the result is the stable sort of every pair as
+        # sorted(..) on the pair dictionary gave, without a len(wo) x len(ma) matrix
+        if len(runs) == 1:
+            return runs[0]
+        return list(heapq.merge(*runs, key=_pair_distance))
+
+def simmilarity_fairness_pairs( data, sensitive_column, sensitive_attribute_values ,simmilarity_attr_hsh ,numrows=None, max_distance=None, top_k=None, different_treatment=None, simmilarity_distance='catnum_simmilarity_distance', block_size=None ):
+    """This method is the query mode of simmilarity_fairness_hash(..): it returns only the close pairs, optionally only those treated
+    differently by the model, without materialising and sorting every pair.
+
+    Examples:
+        simmilarity_fairness_pairs(data, 'sex', ['Female','Male'], spec, max_distance=5, different_treatment=True) returns the same pairs as
+        [(x,y) for (x,y) in simmilarity_fairness_hash(data, 'sex', ['Female','Male'], spec) if y[1] == False and y[0] <= 5].
+
+    Args:
+        data (pandas DataFrame): dataframe containing the sensitive column and the columns of simmilarity_attr_hsh.
+        sensitive_column (str): the sensitive column.
+        sensitive_attribute_values (list): the TWO sensitive values to compare.
+        simmilarity_attr_hsh (dict): column -> 'cat', 'num' or 'target', see categorical_simmilarity_distance(..).
+        numrows (int, optional): only the first numrows individuals of each group are compared, None compares every row.
+        max_distance (float, optional): keep only pairs whose distance is lower or equal to max_distance.
+        top_k (int, optional): keep only the top_k closest pairs.
+        different_treatment (boolean, optional): True keeps only pairs with different predictions, False only pairs with the same one.
+        simmilarity_distance (str): only catnum_simmilarity_distance for the moment.
+        block_size (int, optional): rows of the first group per distance tile, see pairwise_distance_blocks(..).
+    Returns:
+        list : [((i,j),(distance,samePrediction)), ...] sorted by ascending distance.
+    """
+    (wo, ma) = _sensitive_groups(data, sensitive_column, sensitive_attribute_values, numrows, simmilarity_distance)
+    return nearest_pairs(wo, ma, simmilarity_attr_hsh, max_distance=max_distance, top_k=top_k, different_treatment=different_treatment, block_size=block_size)
+
+def simmilarity_fairness_neighbors( data, sensitive_column, sensitive_attribute_values ,simmilarity_attr_hsh , k=None, radius=None, different_treatment=None, numrows=None, simmilarity_distance='catnum_simmilarity_distance' ):
+    """This method finds, for every individual of the first sensitive group, its most simmilar individuals in the second group using
+    a SimmilarityIndex instead of the all pairs scan.
+
+    Args:
+        data (pandas DataFrame): dataframe containing the sensitive column and the columns of simmilarity_attr_hsh.
+        sensitive_column (str): the sensitive column.
+        sensitive_attribute_values (list): the TWO sensitive values to compare, the second group is the indexed one.
+        simmilarity_attr_hsh (dict): column -> 'cat', 'num' or 'target', see categorical_simmilarity_distance(..).
+        k (int, optional): number of neighbours per individual of the first group.
+        radius (float, optional): maximum distance, used when k is None.
+        different_treatment (boolean, optional): True keeps only neighbours with a different prediction, False only those with the same one.
+        numrows (int, optional): only the first numrows individuals of each group are compared, None compares every row.
+        simmilarity_distance (str): only catnum_simmilarity_distance for the moment.
+    Returns:
+        list : [((i,j),(distance,samePrediction)), ...] sorted by ascending distance.
+    """
+    (wo, ma) = _sensitive_groups(data, sensitive_column, sensitive_attribute_values, numrows, simmilarity_distance)
+    return SimmilarityIndex(ma, simmilarity_attr_hsh).query_pairs(wo, k=k, radius=radius, different_treatment=different_treatment)
@@ -0,0 +1,109 @@
+import warnings
+import numpy as np
+import pandas as pd
+from kafkanator.columnar import read_columns
+from kafkanator.fairness.confusion import GroupConfusionCounts, group_codes, _as_binary
+
+# per threshold comparison of the groups, max - min for rates and min / max for the positive rate ratio
+GAP_COLUMNS = ['DEMOGRAPHIC PARITY - P1','EQUAL OPPORTUNITY - TPR','FALSE POSITIVE RATE - FPR','PREDICTIVE PARITY - PPV',
+               'EQUALIZED ODDS - (TPR,FPR)','DISPARATE IMPACT - P1 RATIO']
+
+def sweep_thresholds(scores, thresholds=100):
+    """This method returns the sorted thresholds of a sweep.
+
+    Args:
+        scores (numpy array): the scores, null scores are ignored.
+        thresholds (int or array like): an int gives that many thresholds evenly spaced between the lowest and the highest
+        score, an array gives the thresholds themselves.
+    Returns:
+        numpy array : ascending distinct thresholds.
+    """
+    if np.isscalar(thresholds):
+        finite = scores[np.isfinite(scores)]
+        if len(finite) == 0:
+            return np.empty(0, dtype=np.float64)
+        return np.unique(np.linspace(np.min(finite), np.max(finite), int(thresholds)))
+    return np.unique(np.asarray(thresholds, dtype=np.float64))
+
+def threshold_confusion_counts(codes, keys, scores, reality, thresholds, reality_column='reality'):
+    """This method counts the confusion matrix of every group at every threshold, a row being predicted positive when its
+    score is greater or equal to the threshold.
+
+    Rows are not sorted one threshold at a time: every row is assigned to the threshold interval its score falls into
+    (a binary search over the sorted thresholds), one bincount builds the (group, interval, reality) histogram and the
+    true and false positives of all thresholds are its reversed cumulative sums. The cost is O(n log T + G T) for T thresholds.
+
+    Args:
+        codes (numpy array): group code of every row, -1 for rows to ignore, see group_codes(..).
+        keys (list): group keys.
+        scores (array like): the model scores.
+        reality (array like): binary {1,0} realities.
+        thresholds (numpy array): ascending thresholds.
+        reality_column (str): reality name, used on error messages.
+    Returns:
+        GroupConfusionCounts : counts of shape (thresholds, groups, 2, 2).
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    reality = _as_binary(reality, reality_column)
+    valid = (codes >= 0) & ~np.isnan(scores)
+    # interval[i] = number of thresholds lower or equal to the score, the row is positive for thresholds[:interval[i]]
+    interval = np.searchsorted(thresholds, scores[valid], side='right')
+    cells = (codes[valid] * (len(thresholds) + 1) + interval) * 2 + reality[valid]
+    histogram = np.bincount(cells, minlength=len(keys) * (len(thresholds) + 1) * 2).reshape(len(keys), len(thresholds) + 1, 2)
+    # positives[g, k, r] = rows of group g with reality r and a score >= thresholds[k]
+    positives = np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    totals = histogram.sum(axis=1)
+    counts = np.empty((len(thresholds), len(keys), 2, 2), dtype=np.int64)
+    counts[..., 0, 1] = positives[..., 0].T
+    counts[..., 1, 1] = positives[..., 1].T
+    counts[..., 0, 0] = totals[:, 0] - counts[..., 0, 1]
+    counts[..., 1, 0] = totals[:, 1] - counts[..., 1, 1]
+    return GroupConfusionCounts(keys, counts)
+
+def _gaps(values):
+    """This PRIVATE method returns max - min over the group (last) axis, ignoring groups where the rate is undefined."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmax(values, axis=-1) - np.nanmin(values, axis=-1)
+
+def threshold_curves(dataset,sensitive_attribute,score_column,reality_column,thresholds=100):
+    """This method computes the group fairness metrics at every decision threshold of a score column in a single pass,
+    instead of one fairness_metrics_table(..) call per threshold.
+
+    Examples:
+        >>> (curves, gaps) = threshold_curves(scored, ['race'], 'score', 'two_year_recid', thresholds=np.linspace(0, 1, 1001))
+        >>> gaps['EQUALIZED ODDS - (TPR,FPR)'].idxmin()
+
+    Args:
+        dataset (table): pandas DataFrame, or any table read_columns(..) accepts, with the sensitive attribute column(s),
+        a numerical score column and a binary {1,0} reality column. Rows with a null score or sensitive value are ignored.
+        sensitive_attribute (str or list): The column designing the sensitive attribute : sex, age, handicap, nationality etc.
+        score_column (str): the column storing the model score, a row is predicted 1 when score >= threshold.
+        reality_column (str): the column where dataframe df stores what happens in reality.
+        thresholds (int or array like): see sweep_thresholds(..).
+    Returns:
+        tuple : (curves, gaps). curves has one row per (threshold, group) with the TP, FP, FN, TN counts and the positive rate,
+        TPR, FPR and PPV of the group. gaps is indexed by threshold with the GAP_COLUMNS comparisons of the groups.
+    """
+    sensitive_columns = [sensitive_attribute] if isinstance(sensitive_attribute, str) else list(sensitive_attribute)
+    arrays = read_columns(dataset, list(dict.fromkeys(sensitive_columns + [score_column, reality_column])))
+    codes, keys = group_codes(arrays, sensitive_attribute)
+    if len(keys) == 0:
+        raise ValueError('no row has a sensitive attribute value')
+    scores = np.asarray(arrays[score_column], dtype=np.float64)
+    cuts = sweep_thresholds(scores, thresholds)
+    counts = threshold_confusion_counts(codes, keys, scores, arrays[reality_column], cuts, reality_column)
+    (positive_rate, tpr, fpr, ppv) = (counts.positive_rate(), counts.tpr(), counts.fpr(), counts.ppv())
+    group_keys = pd.Series(keys, dtype=object)
+    curves = pd.DataFrame({'threshold': np.repeat(cuts, len(keys)),
+                           'group': np.tile(group_keys.values, len(cuts)),
+                           'n': counts.n.ravel(), 'tp': counts.tp.ravel(), 'fp': counts.fp.ravel(), 'fn': counts.fn.ravel(),
+                           'tn': counts.tn.ravel(), 'positive_rate': positive_rate.ravel(), 'tpr': tpr.ravel(),
+                           'fpr': fpr.ravel(), 'ppv': ppv.ravel()})
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        ratio = np.nanmin(positive_rate, axis=-1) / np.nanmax(positive_rate, axis=-1)
+    gaps = pd.DataFrame({GAP_COLUMNS[0]: _gaps(positive_rate), GAP_COLUMNS[1]: _gaps(tpr), GAP_COLUMNS[2]: _gaps(fpr),
+                         GAP_COLUMNS[3]: _gaps(ppv), GAP_COLUMNS[4]: np.fmax(_gaps(tpr), _gaps(fpr)), GAP_COLUMNS[5]: ratio},
+                        index=pd.Index(cuts, name='threshold'))
+    return curves, gaps
@@ -1,13 +1,23 @@
-import matplotlib.pyplot as plt
+import logging
 import numpy as np
-from scipy.stats import entropy
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import repeat
+from kafkanator.instrumentation import timed
+from kafkanator.columnar import read_columns
+
+logger = logging.getLogger(__name__)
+
+def _xlogx(x):
+    """This PRIVATE method computes x log x with the 0 log 0 = 0 convention used by entropy."""
+    return np.where(x > 0, x * np.log(np.where(x > 0, x, 1)), 0)
 
 def index_on_dataframe_column(df: pd.DataFrame, column: str, index_function: callable, **kwargs ) -> float :
     """This method computes an inequality index over a pandas dataframe column.
 
     Args:
-        df (pandas DataFrame): The dataframe.
+        df (pandas DataFrame): The dataframe, Arrow tables, Polars DataFrames, numpy structured arrays and parquet paths are
+        accepted too, see read_columns(..).
         column (str): The column on which we will apply the inequality.
         index_function (callable): the index we want to apply, is a kafkanator function such as gini(..), robin_hood(..), theil_index_L(..) or theil_index_T(..).
         kwargs (dict, optional): other parameters the index_function could use, for example if index_function=theil_index_T, we can set the base (e,10) on this dict.
@@ -15,26 +25,59 @@ def index_on_dataframe_column(df: pd.DataFrame, column: str, index_function: cal
     Returns:
         float : the inequality index result you choose applied on the column parameter.
     """
-    sorted_df = df.sort_values(by=[column])
-    return index_function( np.array(sorted_df[column].values ) , **kwargs )
+    sorted_values = np.sort(np.asarray(read_columns(df, [column])[column]))
+    return index_function( sorted_values , **kwargs )
+
+def weighted_gini(income, population=None):
+    """Computes the gini index with a sort based O(n log n) algorithm, the input does not need to be sorted.
+
+    Examples:
+        >>> weighted_gini(np.array([3,1,2,3,1,2,3]))
+        0.20952380952380953
+        >>> weighted_gini(np.array([1,2,3]), population=np.array([2,2,3]))
+        0.20952380952380953
+
+    Args:
+        income (numpy array): Gains in any order, for example [3,1,2] means one person earns 3, another one 1 and another one 2.
+        population (numpy array, optional): contains in position i the amount of people earning income[i]. If None every income counts for one person.
+
+    Returns:
+        float : The Gini index, the same value gini(..) returns on the expanded (one row per person) array.
+    """
+    x = np.asarray(income, dtype=np.float64)
+    if population is None:
+        if np.any(x[1:] < x[:-1]):
+            x = np.sort(x)
+        n = x.shape[0]
+        # For an ascending array sum_{i<j} |xi - xj| = sum_k (2k - n - 1) x_k , k starting at 1.
+        ranks = 2.0 * np.arange(1, n + 1) - n - 1
+        return np.dot(ranks, x) / (n * np.sum(x))
+    w = np.asarray(population, dtype=np.float64)
+    assert(x.shape == w.shape)
+    if np.any(x[1:] < x[:-1]):
+        order = np.argsort(x, kind='stable')
+        x = x[order]
+        w = w[order]
+    cum_w = np.cumsum(w)
+    total_w = cum_w[-1]
+    # Same identity, each person of bucket k sees cum_w[k-1] poorer people and total_w - cum_w[k] richer ones.
+    ranks = cum_w - w + cum_w - total_w
+    return np.dot(ranks * w, x) / (total_w * np.dot(w, x))
 
 def gini(x):
-    """Computes the gini index from an ascending order gains array.
+    """Computes the gini index from a gains array.
 
     Examples:
         >>> gini(np.array([1,1,2,2,3,3,3]))
         0.20952380952380953
 
     Args:
-        x (numpy array): Gains sorted in ascending order, for example [1,1,2,2,3,3,3] means a population of 7 people, the first one gain is 1, the third one 2, and so on.
+        x (numpy array): Gains, for example [1,1,2,2,3,3,3] means a population of 7 people, the first one gain is 1, the third one 2, and so on. Ascending order is not required anymore, see weighted_gini(..).
     
     Returns: 
         float : The Gini index for this array
     """
-    total = 0
-    for i, xi in enumerate(x[:-1], 1):
-        total += np.sum(np.abs(xi - x[i:]))
-    return total / (len(x)**2 * np.mean(x))
+    return weighted_gini(x)
 
 def robin_hood(income_array):
     """Computes robin hood index. This is the percentage of income
@@ -46,12 +89,11 @@ def robin_hood(income_array):
     Returns:
         float : A number between 0 and 1, is the percentage of the income that must be redistributed. A number close to 1 means high concentration of wealth in few hands a number close to 0 means a distribution of wealth close to egalitarian state. 
     """
-    egal_income = sum(income_array) / len(income_array)
-    deltas = []
-    for inc in income_array:
-        if egal_income - inc < 0 :
-            deltas.append(abs(egal_income - inc))
-    rh_index = sum(deltas) / sum(income_array)
+    x = np.asarray(income_array, dtype=np.float64)
+    total = np.sum(x)
+    egal_income = total / len(x)
+    deltas = x[x > egal_income] - egal_income
+    rh_index = np.sum(deltas) / total
     return rh_index
 
 def theil_index_L(income_array):
@@ -63,10 +105,9 @@ def theil_index_L(income_array):
     Returns: 
         float: the theil L index.
     """
-    x_mean = sum(income_array)/len(income_array)
-    divided_mean = [ np.log(x_mean / i) for i in income_array ]
-    summin = sum(divided_mean)
-    return summin/len(income_array)
+    x = np.asarray(income_array, dtype=np.float64)
+    x_mean = np.mean(x)
+    return np.mean(np.log(x_mean / x))
 
 def theil_index_T(income_array,array_type='props',base_entropy=np.e):
     """Computes the Theil T index.
@@ -79,10 +120,13 @@ def theil_index_T(income_array,array_type='props',base_entropy=np.e):
     Returns: 
         float : the theil T index
     """
+    # scipy is only needed here, it is imported on first use to keep the package import light
+    from scipy.stats import entropy
     if array_type == 'props':
         return np.log(len(income_array)) - entropy(income_array,base=base_entropy)
     elif array_type == 'gains':
-        props_array = np.array([x/sum(income_array) for x in income_array])
+        # the total is computed once, it used to be recomputed for every income
+        props_array = np.asarray(income_array, dtype=np.float64) / np.sum(income_array)
         return np.log(len(income_array)) - entropy(props_array,base=base_entropy)
 
 def lorentz_curve ( population , income ,gini_index=False):
@@ -98,49 +142,242 @@ def lorentz_curve ( population , income ,gini_index=False):
         tuple: 2-tuple with 2 list of x,y coordinates to be plotted using the visual framework of your choice. If you set gini_index flag to true, it wil be a 3-tuple, in the third position you find the gini coefficient.
     """
     assert( len(population) == len(income))
-    zippedSortedArray = sorted( list( zip( population , income) ) , key= lambda x: x[1] )
-    print ( ' sorted array ', zippedSortedArray)
-    perc_population = np.array([p/sum(population) for (p,g) in zippedSortedArray])
-    perc_income = np.array([g/sum(income) for (p,g) in zippedSortedArray])
-    cum_perc_pop = np.concatenate(([0], perc_population.cumsum()), axis=None)
-    cum_perc_inc = np.concatenate(([0],perc_income.cumsum()), axis=None)
+    population = np.asarray(population)
+    income = np.asarray(income)
+    with timed(logger, 'lorentz_curve.curve', rows=len(income)):
+        order = np.argsort(income, kind='stable')
+        perc_population = population[order] / np.sum(population)
+        perc_income = income[order] / np.sum(income)
+        cum_perc_pop = np.concatenate(([0], perc_population.cumsum()), axis=None)
+        cum_perc_inc = np.concatenate(([0],perc_income.cumsum()), axis=None)
     if gini_index:
-        arrayGini = []
-        for (p,g) in zippedSortedArray:
-            arrayGini = np.concatenate( ( arrayGini , np.repeat(g,p)  ) )
-        print ( ' gini input ', arrayGini )
-        g_index = gini(np.array(arrayGini))
+        # same value as the gini of the array repeating income[i] population[i] times, without building it
+        with timed(logger, 'lorentz_curve.gini', rows=len(income)):
+            g_index = weighted_gini(income, population)
         return (cum_perc_pop,cum_perc_inc,g_index)
     else:
         return (cum_perc_pop,cum_perc_inc)
 
-def index_per_cluster(df,group_by_column,income_column,index='gini', **kwargs ):
+def weighted_lorentz_curve ( population , income , gini_index=False , num_points=None ):
+    """This function computes the lorentz curve of a population given as (population, income per person) buckets, every bucket
+    weighs population[i] * income[i] on the income axis. Buckets are never expanded to one entry per person.
+
+    Args:
+        population (list): contains in position i the amount of people earning income[i], it can be in the millions.
+        income (list): contains in position i the income of EACH person of bucket i.
+        gini_index (boolean): True if you want the gini computed on the position 3 of returning tuple. False otherwise.
+        num_points (int, optional): if set, the curve is resampled on num_points evenly spaced population shares (from 0 to 1),
+        the lorentz curve is piecewise linear so resampled points lay exactly on it. Handy to plot millions of buckets.
+        Example weighted_lorentz_curve ( [50,20,30,10],[100,300,200,30]) means that 50 people earn 100 each, 20 people earn 300 each and so on.
+
+    Returns:
+        tuple: (x, y) numpy arrays of population and income cumulative shares, plus the gini coefficient in third position if gini_index is True.
+    """
+    assert( len(population) == len(income))
+    population = np.asarray(population, dtype=np.float64)
+    income = np.asarray(income, dtype=np.float64)
+    order = np.argsort(income, kind='stable')
+    sorted_population = population[order]
+    sorted_income = sorted_population * income[order]
+    cum_perc_pop = np.concatenate(([0], np.cumsum(sorted_population) / np.sum(sorted_population)))
+    cum_perc_inc = np.concatenate(([0], np.cumsum(sorted_income) / np.sum(sorted_income)))
+    if num_points is not None:
+        grid = np.linspace(0, 1, num_points)
+        (cum_perc_pop, cum_perc_inc) = (grid, np.interp(grid, cum_perc_pop, cum_perc_inc))
+    if gini_index:
+        return (cum_perc_pop, cum_perc_inc, weighted_gini(income, population))
+    return (cum_perc_pop, cum_perc_inc)
+
+# inequality index name -> index function, theil-t is the only one taking parameters (base_entropy)
+INDEX_FUNCTIONS = {'gini': gini, 'theil-t': theil_index_T, 'theil-l': theil_index_L, 'robin-hood': robin_hood}
+INDEXES = tuple(INDEX_FUNCTIONS)
+
+def _check_index(index):
+    """This PRIVATE method raises a ValueError when index is not a name of INDEX_FUNCTIONS."""
+    if index not in INDEX_FUNCTIONS:
+        raise ValueError('unknown inequality index ' + str(index))
+
+def _cluster_index(incomes, index, kwargs):
+    """This PRIVATE method applies the inequality index named index on the incomes of one cluster."""
+    _check_index(index)
+    if index == 'theil-t':
+        return theil_index_T ( incomes,**kwargs )
+    return INDEX_FUNCTIONS[index](incomes)
+
+def sorted_clusters(df,group_by_column,income_column):
+    """This method sorts a data frame once by (cluster, income) and cuts the sorted incomes into one segment per cluster.
+
+    Args:
+        df (pandas Dataframe): a data frame where you have data about gains to be grouped according to a column, or any table read_columns(..) accepts.
+        group_by_column (str): the column you will perform your group by on.
+        income_column (str): column where you have the gains/incomes.
+
+    Returns:
+        tuple: (keys, incomes, bounds), keys are the sorted cluster values, incomes the incomes sorted by (cluster, income), and
+        incomes[bounds[g]:bounds[g+1]] are the ascending incomes of cluster keys[g]. Rows with a null cluster are dropped.
+    """
+    arrays = read_columns(df, [group_by_column, income_column])
+    codes, uniques = pd.factorize(arrays[group_by_column], sort=True)
+    values = np.asarray(arrays[income_column])
+    valid = codes >= 0
+    (codes, values) = (codes[valid], values[valid])
+    order = np.lexsort((values, codes))
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return uniques.tolist(), values[order], bounds
+
+def index_per_cluster(df,group_by_column,income_column,index='gini', n_jobs=None, executor='thread', **kwargs ):
     """Make clusters over a data frame and apply an inequality index on each of them .
 
     Args:
-        df (pandas Dataframe): a data frame where you have data about gains to be grouped according to a column.
+        df (pandas Dataframe): a data frame where you have data about gains to be grouped according to a column, or any table read_columns(..) accepts.
         group_by_column (str): the column you will perform your group by on.
         income_column (str): column where you have the gains/incomes. For the moment the column must have numeric integer values, not proportions.
         index (str): the type of inequality index you will use , you have gini, theil-t , theil-l, and robin hood.
+        n_jobs (int, optional): number of workers computing the clusters indexes, None or 1 computes them in the calling thread.
+        executor (str): 'thread' for a thread pool or 'process' for a process pool, used when n_jobs > 1.
         kwargs (dict): optional, used in case you use theil - T, you can put here auxiliar parameter such as entropy base. 
 
     Returns:
         list: an array of tuples, each tuple is a value of the group_by_column, followed by the intra cluster resulting inequality index of your choice.
+        Tuples are sorted by group_by_column value whatever the number of workers.
+    """
+    _check_index(index)
+    with timed(logger, 'index_per_cluster.sort') as span:
+        keys, incomes, bounds = sorted_clusters(df, group_by_column, income_column)
+        span['rows'] = len(incomes)
+        span['clusters'] = len(keys)
+    segments = [incomes[bounds[g]:bounds[g + 1]] for g in range(len(keys))]
+    with timed(logger, 'index_per_cluster.indexes', rows=len(incomes), clusters=len(keys), n_jobs=n_jobs or 1):
+        if n_jobs is None or n_jobs <= 1:
+            indexes = [_cluster_index(s, index, kwargs) for s in segments]
+        else:
+            if executor == 'thread':
+                pool = ThreadPoolExecutor(max_workers=n_jobs)
+            elif executor == 'process':
+                pool = ProcessPoolExecutor(max_workers=n_jobs)
+            else:
+                raise ValueError('executor must be thread or process')
+            with pool:
+                chunksize = max(1, len(segments) // (4 * n_jobs))
+                indexes = list(pool.map(_cluster_index, segments, repeat(index), repeat(kwargs), chunksize=chunksize))
+    return list(zip(keys, indexes))
+
+def indexes_per_cluster(df,group_by_column,income_column,indexes=INDEXES,base_entropy=np.e):
+    """Computes several inequality indexes on every cluster of a data frame with segmented numpy reductions, data is sorted
+    once by (cluster, income) and no python code runs per cluster.
+
+    Args:
+        df (pandas Dataframe): a data frame where you have data about gains to be grouped according to a column, or any table read_columns(..) accepts.
+        group_by_column (str): the column you will perform your group by on.
+        income_column (str): column where you have the gains/incomes.
+        indexes (list): the inequality indexes to compute, among gini, theil-t, theil-l and robin-hood.
+        base_entropy (float): entropy base of theil-t, as on theil_index_T(..).
+
+    Returns:
+        DataFrame: one row per value of group_by_column (sorted), one column per index, the same values index_per_cluster(..) returns.
+    """
+    for index in indexes:
+        _check_index(index)
+    keys, incomes, bounds = sorted_clusters(df, group_by_column, income_column)
+    x = incomes.astype(np.float64)
+    starts = bounds[:-1]
+    n = np.diff(bounds).astype(np.float64)
+    group_of = np.repeat(np.arange(len(keys)), np.diff(bounds))
+    table = pd.DataFrame(index=pd.Index(keys, name=group_by_column))
+    if len(keys) == 0:
+        for index in indexes:
+            table[index] = np.array([], dtype=np.float64)
+        return table
+    total = np.add.reduceat(x, starts)
+    mean = total / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for index in indexes:
+            if index == 'gini':
+                ranks = 2.0 * (np.arange(len(x)) - starts[group_of] + 1) - n[group_of] - 1
+                table[index] = np.add.reduceat(ranks * x, starts) / (n * total)
+            elif index == 'theil-t':
+                # log(n) - entropy(x, base) with entropy(x) = log(S) - sum(x log x) / S, zero incomes do not contribute
+                xlogx = np.add.reduceat(_xlogx(x), starts)
+                table[index] = np.log(n) - (np.log(total) - xlogx / total) / np.log(base_entropy)
+            elif index == 'theil-l':
+                table[index] = np.log(mean) - np.add.reduceat(np.log(x), starts) / n
+            elif index == 'robin-hood':
+                table[index] = np.add.reduceat(np.maximum(x - mean[group_of], 0), starts) / total
+    return table
+
+def theil_group_statistics(groups, incomes):
+    """Computes the sufficient statistics of the Theil decomposition of every group in one vectorized pass: the number of
+    people n, the income sum S, the sum of x log x and the sum of log x. They add up across chunks of the same data.
+
+    Args:
+        groups (array like): group of every income, rows with a null group or a null income are ignored.
+        incomes (array like): the incomes.
+
+    Returns:
+        tuple: (keys, statistics), keys are the sorted group values and statistics is a (groups, 4) float64 array whose
+        columns are n, S, sum(x log x) and sum(log x).
+    """
+    if not isinstance(groups, (pd.Series, pd.Categorical, np.ndarray)):
+        groups = np.asarray(groups)
+    codes, uniques = pd.factorize(groups, sort=True)
+    x = np.asarray(incomes, dtype=np.float64)
+    valid = (codes >= 0) & ~np.isnan(x)
+    (codes, x) = (codes[valid], x[valid])
+    with np.errstate(divide='ignore'):
+        columns = (np.ones_like(x), x, _xlogx(x), np.log(x))
+    statistics = np.column_stack([np.bincount(codes, weights=c, minlength=len(uniques)) for c in columns])
+    return uniques.tolist(), statistics
+
+def theil_decomposition_from_statistics(keys, statistics, group_name='group'):
+    """Decomposes the Theil T and Theil L indexes (natural logarithm) of a population into between group and within group
+    inequality from theil_group_statistics(..) statistics.
+
+    With s_g the income share, p_g the population share, mu_g the mean income of group g and mu the overall mean:
+    T = sum_g s_g T_g + sum_g s_g log(mu_g / mu) and L = sum_g p_g L_g + sum_g p_g log(mu / mu_g), the first sums being
+    the within part and the second the between part.
+
+    Args:
+        keys (list): group keys.
+        statistics (numpy array): (groups, 4) n, S, sum(x log x), sum(log x) statistics.
+        group_name (str): name of the index of the per group table.
+
+    Returns:
+        tuple: (summary, groups). summary has rows 'theil-t' and 'theil-l' and columns total, between and within. groups has
+        one row per group with n, income_share, population_share and the group theil-t and theil-l.
+    """
+    (n, total, xlogx, logx) = np.asarray(statistics, dtype=np.float64).T
+    (N, S) = (np.sum(n), np.sum(total))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        (mu, mu_g) = (S / N, total / n)
+        (income_share, population_share) = (total / S, n / N)
+        theil_t_g = xlogx / total - np.log(mu_g)
+        theil_l_g = np.log(mu_g) - logx / n
+        t_within = np.sum(income_share * theil_t_g)
+        t_between = np.sum(income_share * np.log(mu_g / mu))
+        l_within = np.sum(population_share * theil_l_g)
+        l_between = np.sum(population_share * np.log(mu / mu_g))
+        summary = pd.DataFrame({'total': [np.sum(xlogx) / S - np.log(mu), np.log(mu) - np.sum(logx) / N],
+                                'between': [t_between, l_between], 'within': [t_within, l_within]}, index=['theil-t', 'theil-l'])
+    groups = pd.DataFrame({'n': n.astype(np.int64), 'income_share': income_share, 'population_share': population_share,
+                           'theil-t': theil_t_g, 'theil-l': theil_l_g}, index=pd.Index(keys, name=group_name))
+    return summary, groups
+
+def theil_decomposition(df,group_by_column,income_column):
+    """Computes the total, between group and within group Theil T and Theil L inequality of a data frame in one pass.
+
+    Examples:
+        >>> (summary, groups) = theil_decomposition(salaries, 'region', 'salary')
+        >>> summary.loc['theil-t', 'between'] / summary.loc['theil-t', 'total']
+
+    Args:
+        df (pandas Dataframe): a data frame where you have data about gains to be grouped according to a column, or any table read_columns(..) accepts.
+        group_by_column (str): the column defining the groups.
+        income_column (str): column where you have the gains/incomes.
+
+    Returns:
+        tuple: (summary, groups), see theil_decomposition_from_statistics(..). Chunked data can be decomposed with
+        TheilDecompositionAccumulator from kafkanator.accumulators.
     """
-    salary_groups = df.groupby ([group_by_column]) 
-    setOfCats = set(df[group_by_column].values)
-    indexes = []
-    for s in setOfCats:
-        subgroup = df.iloc[salary_groups.groups[s],:]
-        incomes = sorted(subgroup[income_column].values)
-        print ( 'sorted incomes ',s, ' ', incomes)
-        if index == 'gini':
-            g = gini(incomes)
-        elif index == 'theil-t':
-            g = theil_index_T ( incomes,**kwargs )
-        elif index == 'theil-l':
-            g = theil_index_L ( incomes )               
-        elif index == 'robin-hood':
-            g = robin_hood ( incomes )
-        indexes.append((s,g))
-    return indexes
\ No newline at end of file
+    arrays = read_columns(df, [group_by_column, income_column])
+    keys, statistics = theil_group_statistics(arrays[group_by_column], arrays[income_column])
+    return theil_decomposition_from_statistics(keys, statistics, group_by_column)
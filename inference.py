@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+from kafkanator.inequality import INDEXES, _xlogx, _cluster_index
+
+# upper bound on the replicates x distinct incomes cells of one bootstrap batch
+MAX_BATCH_CELLS = 2000000
+
+def point_estimate(x, index, base_entropy=np.e):
+    """Computes the inequality index named index ('gini', 'theil-t', 'theil-l' or 'robin-hood') on the incomes x."""
+    return _cluster_index(x, index, {'base_entropy': base_entropy})
+
+def leave_one_out(x, index, base_entropy=np.e):
+    """Computes the index on every leave-one-out sample with closed forms, O(n log n) in total instead of n index computations.
+
+    Args:
+        x (numpy array): incomes, in any order.
+        index (str): 'gini', 'theil-t', 'theil-l' or 'robin-hood'.
+        base_entropy (float): entropy base of theil-t.
+
+    Returns:
+        numpy array: in position k the index of the incomes without the k-th smallest one (incomes are sorted first).
+    """
+    x = np.sort(np.asarray(x, dtype=np.float64))
+    n = len(x)
+    total = np.sum(x)
+    rest = total - x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if index == 'gini':
+            prefix = np.concatenate(([0], np.cumsum(x)))
+            k = np.arange(1, n + 1)
+            pair_sum = np.dot(2.0 * k - n - 1, x)
+            # sum of |x_k - x_j| over every j, split between poorer and richer incomes
+            own = x * (k - 1) - prefix[:-1] + (total - prefix[1:]) - x * (n - k)
+            return (pair_sum - own) / ((n - 1) * rest)
+        elif index == 'theil-t':
+            xlogx = _xlogx(x)
+            rest_xlogx = np.sum(xlogx) - xlogx
+            return np.log(n - 1) - (np.log(rest) - rest_xlogx / rest) / np.log(base_entropy)
+        elif index == 'theil-l':
+            logs = np.log(x)
+            return np.log(rest / (n - 1)) - (np.sum(logs) - logs) / (n - 1)
+        elif index == 'robin-hood':
+            prefix = np.concatenate(([0], np.cumsum(x)))
+            mean = rest / (n - 1)
+            first_above = np.searchsorted(x, mean, side='right')
+            above = (total - prefix[first_above]) - (n - first_above) * mean
+            above -= np.maximum(x - mean, 0)
+            return above / rest
+    raise ValueError('unknown inequality index ' + str(index))
+
+def jackknife_se(x, index, base_entropy=np.e):
+    """Jackknife standard error of an inequality index, from the closed form leave_one_out(..) values."""
+    values = leave_one_out(x, index, base_entropy)
+    n = len(values)
+    return np.sqrt((n - 1) / n * np.sum((values - np.mean(values)) ** 2))
+
+def bootstrap_replicates(values, population, n_replicates, indexes, seed_sequence, base_entropy=np.e):
+    """Computes bootstrap replicates of several indexes as 2-D numpy operations.
+
+    Resampling n incomes with replacement is the same as drawing how many times every distinct income appears from a multinomial,
+    so a batch of replicates is a (replicates, distinct incomes) weight matrix and every index is a weighted reduction of it.
+
+    Args:
+        values (numpy array): distinct incomes, ascending.
+        population (numpy array): number of people earning each distinct income.
+        n_replicates (int): number of replicates.
+        indexes (list): indexes to compute.
+        seed_sequence (numpy SeedSequence or int): seed of the random generator.
+        base_entropy (float): entropy base of theil-t.
+
+    Returns:
+        dict: index -> array of n_replicates values.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    n = int(np.sum(population))
+    weights = rng.multinomial(n, population / n, size=n_replicates).astype(np.float64)
+    total = weights @ values
+    out = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for index in indexes:
+            if index == 'gini':
+                cum = np.cumsum(weights, axis=1)
+                out[index] = np.sum(weights * values * (2 * cum - weights - n), axis=1) / (n * total)
+            elif index == 'theil-t':
+                out[index] = np.log(n) - (np.log(total) - (weights @ _xlogx(values)) / total) / np.log(base_entropy)
+            elif index == 'theil-l':
+                out[index] = np.log(total / n) - (weights @ np.log(values)) / n
+            elif index == 'robin-hood':
+                out[index] = np.sum(weights * np.maximum(values - total[:, None] / n, 0), axis=1) / total
+            else:
+                raise ValueError('unknown inequality index ' + str(index))
+    return out
+
+def inequality_inference(income_array, indexes=INDEXES, n_replicates=1000, confidence=0.95, seed=None, n_jobs=None, executor='thread', base_entropy=np.e):
+    """Computes inequality indexes with jackknife and bootstrap standard errors and percentile bootstrap intervals.
+
+    Examples:
+        >>> inequality_inference(workers['salary'].values, n_replicates=2000, seed=42)
+
+    Args:
+        income_array (list): array of incomes, the order is not important.
+        indexes (list): indexes among 'gini', 'theil-t', 'theil-l' and 'robin-hood'.
+        n_replicates (int): number of bootstrap replicates, 0 to only compute jackknife errors.
+        confidence (float): confidence level of the bootstrap intervals.
+        seed (int, optional): seed, the same seed gives the same result whatever n_jobs.
+        n_jobs (int, optional): number of workers computing replicate batches, None computes them in the calling thread.
+        executor (str): 'thread' or 'process' pool, multinomial draws hold the GIL so processes scale better on many cores.
+        base_entropy (float): entropy base of theil-t.
+
+    Returns:
+        DataFrame: one row per index with columns estimate, jackknife_se, bootstrap_se, lower and upper.
+    """
+    x = np.asarray(income_array, dtype=np.float64)
+    values, population = np.unique(x, return_counts=True)
+    batch = max(1, MAX_BATCH_CELLS // max(1, len(values)))
+    batches = [batch] * (n_replicates // batch) + ([n_replicates % batch] if n_replicates % batch > 0 else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    if n_jobs is None or n_jobs <= 1:
+        results = [bootstrap_replicates(values, population, b, indexes, s, base_entropy) for (b, s) in zip(batches, seeds)]
+    else:
+        if executor == 'thread':
+            pool = ThreadPoolExecutor(max_workers=n_jobs)
+        elif executor == 'process':
+            pool = ProcessPoolExecutor(max_workers=n_jobs)
+        else:
+            raise ValueError('executor must be thread or process')
+        with pool:
+            results = list(pool.map(bootstrap_replicates, repeat(values), repeat(population), batches, repeat(indexes), seeds, repeat(base_entropy)))
+    alpha = (1 - confidence) / 2
+    rows = []
+    for index in indexes:
+        replicates = np.concatenate([r[index] for r in results]) if len(results) > 0 else np.empty(0)
+        has_replicates = len(replicates) > 0
+        rows.append({'estimate': point_estimate(x, index, base_entropy),
+                     'jackknife_se': jackknife_se(x, index, base_entropy),
+                     'bootstrap_se': np.std(replicates, ddof=1) if len(replicates) > 1 else np.nan,
+                     'lower': np.quantile(replicates, alpha) if has_replicates else np.nan,
+                     'upper': np.quantile(replicates, 1 - alpha) if has_replicates else np.nan})
+    return pd.DataFrame(rows, index=list(indexes))
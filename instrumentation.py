@@ -0,0 +1,93 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+# attribute of the log records carrying a timing span
+SPAN_ATTRIBUTE = 'kafkanator_span'
+
+@contextmanager
+def timed(logger, stage, **counters):
+    """Times the enclosed block and reports it as a span at DEBUG level on logger.
+
+    The block receives the counters dictionary, so counts known only inside the block (pairs, groups) can be added to it.
+    When DEBUG is disabled on logger, which is the default, nothing is timed nor formatted.
+
+    Examples:
+        >>> with timed(logger, 'index_per_cluster.sort', rows=len(df)) as span:
+        ...     keys, incomes, bounds = sorted_clusters(df, group_by_column, income_column)
+        ...     span['clusters'] = len(keys)
+
+    Args:
+        logger (logging.Logger): the module logger.
+        stage (str): the span name, 'function.stage' by convention.
+        counters: row counts and other numbers describing the work of the block.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        yield counters
+        return
+    start = time.perf_counter()
+    try:
+        yield counters
+    finally:
+        seconds = time.perf_counter() - start
+        span = dict(counters, stage=stage, seconds=seconds, logger=logger.name)
+        logger.debug('%s took %.6fs %s', stage, seconds, counters, extra={SPAN_ATTRIBUTE: span})
+
+class Profile(logging.Handler):
+    """Collects the timing spans of kafkanator functions run inside a with block.
+
+    Entering the block enables DEBUG on the logger for its duration and attaches the profile to it, leaving restores the
+    previous level. Spans are plain dictionaries with the stage name, its duration in seconds and its counters.
+
+    Examples:
+        >>> with Profile() as profile:
+        ...     fairness_metrics_table(df, ['race'], 'prediction', 'reality')
+        >>> profile.summary()
+        >>> profile.to_json('profile.json')
+
+    Args:
+        logger (str): name of the logger to listen to, 'kafkanator' collects every module of the package.
+    """
+
+    def __init__(self, logger='kafkanator'):
+        logging.Handler.__init__(self, level=logging.DEBUG)
+        self.logger = logging.getLogger(logger)
+        self.spans = []
+        self._level = None
+
+    def __enter__(self):
+        self._level = self.logger.level
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.logger.removeHandler(self)
+        self.logger.setLevel(self._level)
+        return False
+
+    def emit(self, record):
+        span = getattr(record, SPAN_ATTRIBUTE, None)
+        if span is not None:
+            self.spans.append(span)
+
+    def to_frame(self):
+        """Returns the spans as a pandas DataFrame, one row per span in completion order, counters as columns."""
+        import pandas as pd
+        return pd.DataFrame(self.spans)
+
+    def summary(self):
+        """Returns a DataFrame with the number of calls and the total seconds of every stage, slowest first."""
+        frame = self.to_frame()
+        if len(frame) == 0:
+            return frame
+        summary = frame.groupby('stage')['seconds'].agg(['count', 'sum']).rename(columns={'count': 'calls', 'sum': 'seconds'})
+        return summary.sort_values('seconds', ascending=False)
+
+    def to_json(self, path=None):
+        """Exports the spans as a json list, written to path if given, returned as a string otherwise."""
+        if path is None:
+            return json.dumps(self.spans, default=float)
+        with open(path, 'w') as f:
+            json.dump(self.spans, f, default=float)
@@ -1,11 +1,12 @@
 
+import os
 import unittest
-from inequality import *
+from kafkanator.inequality import *
 
 class TestCalculations(unittest.TestCase):
 
     def test_cluster(self):
-        workers = pd.read_csv('./data/salaries.csv',sep=',',header=0)
+        workers = pd.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)),'data','salaries.csv'),sep=',',header=0)
         withGini = index_per_cluster(workers,'diploma','salary',index='gini')
         print ( ' the gini is ', withGini )
         withTheil_L = index_per_cluster(workers,'diploma','salary',index='theil-l')
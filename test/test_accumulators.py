@@ -0,0 +1,57 @@
+import unittest
+import io
+import numpy as np
+import pandas as pd
+from kafkanator.inequality import gini, robin_hood, theil_index_L, theil_index_T, theil_decomposition
+from kafkanator.accumulators import (MeanAccumulator, TheilTAccumulator, TheilLAccumulator, GiniAccumulator,
+                                     RobinHoodAccumulator, TheilDecompositionAccumulator, accumulate_column)
+
+
+class AccumulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        self.x = rng.integers(500, 9000, 3000)
+        self.chunks = np.array_split(self.x, 7)
+
+    def stream(self, make):
+        left, right = make(), make()
+        for chunk in self.chunks[:4]:
+            left.update(chunk)
+        for chunk in self.chunks[4:]:
+            right.update(pd.Series(chunk))
+        return left.merge(right).result()
+
+    def test_exact_accumulators(self):
+        self.assertAlmostEqual(self.stream(MeanAccumulator), self.x.mean())
+        self.assertAlmostEqual(self.stream(TheilTAccumulator), theil_index_T(self.x))
+        self.assertAlmostEqual(self.stream(lambda: TheilTAccumulator(base_entropy=10)), theil_index_T(self.x, base_entropy=10))
+        self.assertAlmostEqual(self.stream(TheilLAccumulator), theil_index_L(self.x))
+        self.assertAlmostEqual(self.stream(GiniAccumulator), gini(self.x))
+        self.assertAlmostEqual(self.stream(RobinHoodAccumulator), robin_hood(self.x))
+
+    def test_binned_gini_is_close(self):
+        self.assertAlmostEqual(self.stream(lambda: GiniAccumulator(bin_width=10)), gini(self.x), places=3)
+
+    def test_csv_chunks(self):
+        csv = io.StringIO(pd.DataFrame({'salary': self.x}).to_csv(index=False))
+        (g, rh) = accumulate_column(pd.read_csv(csv, chunksize=250), 'salary', GiniAccumulator(), RobinHoodAccumulator())
+        self.assertAlmostEqual(g, gini(self.x))
+        self.assertAlmostEqual(rh, robin_hood(self.x))
+
+    def test_theil_decomposition_chunks(self):
+        groups = np.where(self.x > 3000, 'high', 'low')
+        df = pd.DataFrame({'g': groups, 'x': self.x})
+        (left, right) = (TheilDecompositionAccumulator(), TheilDecompositionAccumulator())
+        for (g, chunk) in zip(np.array_split(groups, 7)[:4], self.chunks[:4]):
+            left.update(g, chunk)
+        for (g, chunk) in zip(np.array_split(groups, 7)[4:], self.chunks[4:]):
+            right.update(g, chunk)
+        (summary, per_group) = left.merge(right).result()
+        (expected_summary, expected_groups) = theil_decomposition(df, 'g', 'x')
+        pd.testing.assert_frame_equal(summary, expected_summary)
+        np.testing.assert_allclose(per_group.values, expected_groups.values)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.audit import fairness_metrics_table_from_files, file_confusion_counts, list_partitions
+from kafkanator.fairness.confusion import group_confusion_counts
+from kafkanator.fairness.metrics import fairness_metrics_table
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+class FileAuditTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        n = 3000
+        self.df = pd.DataFrame({'race': rng.choice(['A', 'B', 'C'], size=n), 'sex': rng.choice(['F', 'M'], size=n),
+                                'prediction': rng.integers(0, 2, size=n), 'reality': rng.integers(0, 2, size=n),
+                                'score': rng.random(n)})
+        self.directory = tempfile.TemporaryDirectory()
+        # month partitions, the last one without any 'C' row
+        parts = [self.df.iloc[0:1000], self.df.iloc[1000:2500], self.df.iloc[2500:][self.df['race'].iloc[2500:] != 'C']]
+        self.expected = pd.concat(parts)
+        for (m, part) in enumerate(parts):
+            os.makedirs(os.path.join(self.directory.name, 'month=%d' % m))
+            part.to_csv(os.path.join(self.directory.name, 'month=%d' % m, 'scores.csv'), index=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_same_table_as_in_memory(self):
+        expected = fairness_metrics_table(self.expected, ['race', 'sex'], 'prediction', 'reality', aggregate_metrics=True)
+        table = fairness_metrics_table_from_files(self.directory.name, ['race', 'sex'], 'prediction', 'reality', aggregate_metrics=True, chunk_rows=128)
+        pd.testing.assert_frame_equal(table, expected)
+
+    def test_processes(self):
+        counts = file_confusion_counts(self.directory.name, ['race'], 'prediction', 'reality', chunk_rows=500, n_jobs=2)
+        expected = group_confusion_counts(self.expected, ['race'], 'prediction', 'reality')
+        self.assertEqual(counts.keys, expected.keys)
+        np.testing.assert_array_equal(counts.counts, expected.counts)
+
+    def test_partitions(self):
+        self.assertEqual(len(list_partitions(self.directory.name)), 3)
+        self.assertEqual(len(list_partitions(os.path.join(self.directory.name, 'month=*', '*.csv'))), 3)
+        with self.assertRaises(ValueError):
+            file_confusion_counts(os.path.join(self.directory.name, 'missing*.csv'), ['race'], 'prediction', 'reality')
+
+    @unittest.skipUnless(HAS_PYARROW, 'pyarrow is not installed')
+    def test_parquet(self):
+        path = os.path.join(self.directory.name, 'scores.parquet')
+        self.df.to_parquet(path, row_group_size=700)
+        expected = fairness_metrics_table(self.df, ['race'], 'prediction', 'reality')
+        pd.testing.assert_frame_equal(fairness_metrics_table_from_files(path, ['race'], 'prediction', 'reality', chunk_rows=256), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from kafkanator.benchmarks import suite
+
+
+class BenchmarkSuiteTest(unittest.TestCase):
+
+    def test_every_benchmark_runs(self):
+        results = suite.run(max_size=100, repeat=1, min_time=0)
+        self.assertEqual(sorted(r['benchmark'] for r in results), sorted(suite.BENCHMARKS))
+        for r in results:
+            self.assertEqual(r['size'], 100)
+            self.assertGreater(r['seconds'], 0)
+            self.assertGreater(r['peak_bytes'], 0)
+
+    def test_size_caps(self):
+        results = suite.run(['simmilarity_fairness_hash'], max_size=10 ** 7, repeat=1, min_time=0, sizes=[100, 10 ** 5])
+        self.assertEqual([r['size'] for r in results], [100])
+
+    def test_compare_flags_regressions(self):
+        baseline = [{'benchmark': 'gini', 'size': 100, 'seconds': 1.0, 'peak_bytes': 1000},
+                    {'benchmark': 'gini', 'size': 1000, 'seconds': 1.0, 'peak_bytes': 1000}]
+        results = [{'benchmark': 'gini', 'size': 100, 'seconds': 1.1, 'peak_bytes': 5000},
+                   {'benchmark': 'gini', 'size': 1000, 'seconds': 2.0, 'peak_bytes': 1000},
+                   {'benchmark': 'gini', 'size': 10000, 'seconds': 9.0, 'peak_bytes': 9000}]
+        comparison = suite.compare(results, baseline)
+        self.assertEqual(comparison['regression'].tolist(), [False, True])
+        self.assertAlmostEqual(comparison['time_ratio'].iloc[1], 2.0)
+
+    def test_unknown_benchmark(self):
+        with self.assertRaises(ValueError):
+            suite.run(['median'])
+
+
+if __name__ == '__main__':
+    unittest.main()
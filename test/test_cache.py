@@ -0,0 +1,82 @@
+import gc
+import sys
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.cache import CountsCache, active_cache, counts_cache
+from kafkanator.fairness.metrics import fairness_metrics_table, statistical_parity, equal_opportunity, statistical_parity_data
+
+
+class CountsCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        n = 1000
+        self.df = pd.DataFrame({'sex': rng.choice(['F', 'M'], n), 'prediction': rng.integers(0, 2, n), 'reality': rng.integers(0, 2, n)})
+
+    def test_off_by_default(self):
+        self.assertIsNone(active_cache())
+
+    def test_hits_and_invalidation(self):
+        expected = fairness_metrics_table(self.df, ['sex'], 'prediction', 'reality')
+        with counts_cache() as cache:
+            sp = statistical_parity(self.df, 'sex', 'prediction', 'reality')
+            equal_opportunity(self.df.copy(), 'sex', 'prediction', 'reality')
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            pd.testing.assert_frame_equal(fairness_metrics_table(self.df, ['sex'], 'prediction', 'reality'), expected)
+            # a str and a list sensitive attribute give different group keys, they are cached apart
+            self.assertEqual(cache.misses, 2)
+            self.df.loc[0, 'prediction'] = 1 - self.df.loc[0, 'prediction']
+            self.assertNotEqual(statistical_parity(self.df, 'sex', 'prediction', 'reality'), sp)
+            self.assertEqual(cache.misses, 3)
+        self.assertIsNone(active_cache())
+
+    def test_statistical_parity_data(self):
+        table = statistical_parity_data(self.df, 'sex', 'prediction', 'reality')
+        self.assertEqual(table['number'].sum(), len(self.df))
+        expected = self.df.groupby(['sex', 'prediction']).size()
+        for (_, row) in table.iterrows():
+            self.assertEqual(row['number'], expected[(row['attr'], row['prediction'])])
+        with counts_cache() as cache:
+            statistical_parity_data(self.df, 'sex', 'prediction', 'reality')
+            pd.testing.assert_frame_equal(statistical_parity_data(self.df, 'sex', 'prediction', 'reality'), table)
+            self.assertEqual(cache.hits, 1)
+
+    def test_string_column_edits_invalidate(self):
+        with counts_cache() as cache:
+            sp = statistical_parity(self.df, 'sex', 'prediction', 'reality')
+            statistical_parity(self.df.copy(), 'sex', 'prediction', 'reality')
+            self.assertEqual(cache.hits, 1)
+            self.df.loc[self.df['sex'] == 'F', 'sex'] = 'X'
+            self.assertNotEqual(statistical_parity(self.df, 'sex', 'prediction', 'reality'), sp)
+            self.assertEqual(cache.misses, 2)
+
+    def test_columns_are_not_kept(self):
+        token = ''.join(['not', 'kept'])
+        references = sys.getrefcount(token)
+        with counts_cache() as cache:
+            df = pd.DataFrame({'sex': np.array([token, 'M'] * 500, dtype=object), 'prediction': self.df['prediction'],
+                               'reality': self.df['reality']})
+            statistical_parity(df, 'sex', 'prediction', 'reality')
+            del df
+            gc.collect()
+            self.assertEqual(len(cache), 1)
+            self.assertLessEqual(sys.getrefcount(token), references + 1)
+
+    def test_lru_eviction(self):
+        cache = CountsCache(max_entries=2)
+        for k in ('a', 'b', 'a', 'c'):
+            cache.get_or_compute(k, lambda: np.zeros(3))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        cache.get_or_compute('a', lambda: np.zeros(3))
+        self.assertEqual(cache.hits, 2)
+        cache.get_or_compute('b', lambda: np.zeros(3))
+        self.assertEqual((cache.misses, len(cache)), (4, 2))
+        small = CountsCache(max_bytes=1000)
+        small.get_or_compute('big', lambda: pd.DataFrame({'x': np.zeros(1000)}))
+        self.assertEqual(len(small), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
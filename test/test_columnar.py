@@ -0,0 +1,60 @@
+import importlib.util
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator.columnar import read_columns
+from kafkanator.inequality import index_per_cluster, index_on_dataframe_column, gini
+from kafkanator.fairness.metrics import fairness_metrics_table
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+HAS_POLARS = importlib.util.find_spec('polars') is not None
+
+
+class ColumnarInputTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.df = pd.DataFrame({'sex': rng.choice(['F', 'M'], size=300), 'prediction': rng.integers(0, 2, size=300),
+                                'reality': rng.integers(0, 2, size=300), 'income': rng.integers(1, 1000, size=300)})
+        self.expected_table = fairness_metrics_table(self.df, ['sex'], 'prediction', 'reality', aggregate_metrics=True)
+        self.expected_clusters = index_per_cluster(self.df, 'sex', 'income')
+
+    def check(self, table):
+        pd.testing.assert_frame_equal(fairness_metrics_table(table, ['sex'], 'prediction', 'reality', aggregate_metrics=True), self.expected_table)
+        self.assertEqual(index_per_cluster(table, 'sex', 'income'), self.expected_clusters)
+        self.assertAlmostEqual(index_on_dataframe_column(table, 'income', gini), gini(self.df['income'].values))
+
+    def test_structured_array_is_a_view(self):
+        records = self.df.to_records(index=False).astype([('sex', 'U1'), ('prediction', 'i8'), ('reality', 'i8'), ('income', 'i8')])
+        self.assertTrue(np.shares_memory(read_columns(records, ['income'])['income'], records))
+        self.check(records)
+
+    def test_dictionary_of_arrays(self):
+        self.check({c: self.df[c].to_numpy() for c in self.df.columns})
+
+    def test_unsupported(self):
+        with self.assertRaises(TypeError):
+            read_columns(np.arange(3), ['income'])
+
+    @unittest.skipUnless(HAS_PYARROW, 'pyarrow is not installed')
+    def test_arrow_and_parquet(self):
+        import os
+        import tempfile
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(self.df, preserve_index=False)
+        self.check(table)
+        self.check(table.replace_schema_metadata(None).set_column(0, 'sex', table.column('sex').dictionary_encode()))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'scores.parquet')
+            pq.write_table(table, path)
+            self.check(path)
+
+    @unittest.skipUnless(HAS_POLARS, 'polars is not installed')
+    def test_polars(self):
+        import polars as pl
+        self.check(pl.from_pandas(self.df))
+
+
+if __name__ == '__main__':
+    unittest.main()
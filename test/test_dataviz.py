@@ -0,0 +1,40 @@
+import importlib.util
+import unittest
+import numpy as np
+from kafkanator.dataviz import density_bins, pairs_to_arrays, simmilarity_fairness_3d
+
+HAS_PLOTLY = importlib.util.find_spec('plotly') is not None
+
+
+class SimmilarityPlotTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.pairs = [((int(i), int(j)), (float(d), False)) for (i, j, d) in zip(rng.integers(0, 300, 5000), rng.integers(0, 300, 5000), rng.integers(0, 6, 5000))]
+
+    def test_arrays(self):
+        (x, y, z) = pairs_to_arrays(self.pairs)
+        self.assertEqual(len(x), 5000)
+        self.assertEqual((x[3], y[3], z[3]), (self.pairs[3][0][0], self.pairs[3][0][1], self.pairs[3][1][0]))
+
+    def test_density_keeps_the_closest_pair_of_every_cell(self):
+        (x, y, z) = pairs_to_arrays(self.pairs)
+        (cx, cy, cz, count) = density_bins(x, y, z, bins=10)
+        self.assertEqual(count.sum(), 5000)
+        self.assertLessEqual(len(cz), 100)
+        self.assertEqual(cz.min(), z.min())
+
+    @unittest.skipUnless(HAS_PLOTLY, 'plotly is not installed')
+    def test_modes(self):
+        self.assertEqual(len(simmilarity_fairness_3d(self.pairs).data[0].x), 5000)
+        self.assertEqual(len(simmilarity_fairness_3d(self.pairs, mode='sample', max_points=1000).data[0].x), 1000)
+        density = simmilarity_fairness_3d(self.pairs, max_points=1000, bins=20)
+        self.assertLessEqual(len(density.data[0].x), 400)
+        # zero distances used to divide by zero
+        self.assertTrue(np.isfinite(density.data[0].marker.color).all())
+        with self.assertRaises(ValueError):
+            simmilarity_fairness_3d(self.pairs, mode='hexbin')
+
+
+if __name__ == '__main__':
+    unittest.main()
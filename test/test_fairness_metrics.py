@@ -0,0 +1,128 @@
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.metrics import fairness_metrics_table, equal_opportunity, fpr_fnr
+from kafkanator.fairness.confusion import group_confusion_counts
+from kafkanator.fairness.bootstrap import fairness_metrics_bootstrap
+
+
+class FusedCountsTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        n = 2000
+        self.df = pd.DataFrame({'sex': rng.integers(0, 2, n), 'race': rng.choice(['x', 'y', 'z'], n),
+                                'prediction': rng.integers(0, 2, n), 'reality': rng.integers(0, 2, n)})
+
+    def test_counts_match_groupby(self):
+        counts = group_confusion_counts(self.df, ['sex', 'race'], 'prediction', 'reality')
+        for (key, cm) in zip(counts.keys, counts.counts):
+            sub = self.df[(self.df['sex'] == key[0]) & (self.df['race'] == key[1])]
+            for r in (0, 1):
+                for p in (0, 1):
+                    self.assertEqual(cm[r, p], ((sub['reality'] == r) & (sub['prediction'] == p)).sum())
+        self.assertEqual(counts.keys, [k for (k, v) in self.df.groupby(by=['sex', 'race'])])
+
+    def test_metric_functions(self):
+        tpr = equal_opportunity(self.df, 'sex', 'prediction', 'reality')
+        for (k, v) in self.df.groupby(by='sex'):
+            positives = v[v['reality'] == 1]
+            self.assertAlmostEqual(tpr[k], positives['prediction'].mean())
+        (fpr, fnr) = fpr_fnr(self.df, 'sex', 'prediction', 'reality')
+        self.assertEqual(sorted(fpr.keys()), [0, 1])
+
+    def test_table(self):
+        table = fairness_metrics_table(self.df, ['sex'], 'prediction', 'reality', aggregate_metrics=True)
+        self.assertEqual(list(table.columns), ['0', '1', 'DELTA'])
+        p1 = self.df.groupby('sex')['prediction'].mean()
+        self.assertAlmostEqual(table.loc['DEMOGRAPHIC PARITY - P1', '1'], p1[1])
+
+    def test_non_binary_prediction(self):
+        self.df.loc[0, 'prediction'] = 2
+        with self.assertRaises(ValueError):
+            group_confusion_counts(self.df, 'sex', 'prediction', 'reality')
+
+
+class MultiModelTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(8)
+        n = 1500
+        self.df = pd.DataFrame({'race': rng.choice(['x', 'y', 'z'], n), 'reality': rng.integers(0, 2, n),
+                                'model_a': rng.integers(0, 2, n), 'model_b': rng.integers(0, 2, n), 'model_c': rng.integers(0, 2, n)})
+        self.models = ['model_a', 'model_b', 'model_c']
+
+    def test_table_has_a_model_level(self):
+        table = fairness_metrics_table(self.df, ['race'], self.models, 'reality', aggregate_metrics=True)
+        self.assertEqual(table.columns.names[0], 'model')
+        for m in self.models:
+            expected = fairness_metrics_table(self.df, ['race'], m, 'reality', aggregate_metrics=True)
+            pd.testing.assert_frame_equal(table[m], expected)
+
+    def test_prediction_matrix_and_metric_functions(self):
+        counts = group_confusion_counts(self.df, 'race', self.df[self.models].to_numpy(), 'reality')
+        self.assertEqual(counts.counts.shape, (3, 3, 2, 2))
+        self.assertEqual(counts.models, [0, 1, 2])
+        tpr = equal_opportunity(self.df, 'race', self.models, 'reality')
+        for m in self.models:
+            self.assertEqual(tpr[m], equal_opportunity(self.df, 'race', m, 'reality'))
+        np.testing.assert_array_equal(counts.model(1).counts, group_confusion_counts(self.df, 'race', 'model_b', 'reality').counts)
+
+    def test_prediction_arrays(self):
+        expected = group_confusion_counts(self.df, 'race', 'model_a', 'reality')
+        for prediction in (self.df['model_a'].to_numpy(), self.df['model_a']):
+            counts = group_confusion_counts(self.df, 'race', prediction, 'reality')
+            self.assertIsNone(counts.models)
+            np.testing.assert_array_equal(counts.counts, expected.counts)
+
+    def test_invalid_prediction_arrays(self):
+        with self.assertRaisesRegex(ValueError, 'rows'):
+            group_confusion_counts(self.df, 'race', self.df[self.models].to_numpy()[:-1], 'reality')
+        with self.assertRaisesRegex(ValueError, '1-D'):
+            group_confusion_counts(self.df, 'race', np.zeros((len(self.df), 2, 2)), 'reality')
+        matrix = self.df[self.models].to_numpy().copy()
+        matrix[0, 0] = 3
+        with self.assertRaisesRegex(ValueError, '^column prediction matrix must'):
+            group_confusion_counts(self.df, 'race', matrix, 'reality')
+
+
+class BootstrapTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.df = pd.DataFrame({'sex': rng.integers(0, 2, 600), 'prediction': rng.integers(0, 2, 600),
+                                'reality': rng.integers(0, 2, 600)})
+
+    def test_intervals_surround_table_values(self):
+        table = fairness_metrics_table(self.df, ['sex'], 'prediction', 'reality')
+        ci = fairness_metrics_bootstrap(self.df, ['sex'], 'prediction', 'reality', n_replicates=800, seed=3)
+        for group in ['0', '1']:
+            np.testing.assert_allclose(ci[(group, 'value')].values, table[group].values.astype(float))
+            self.assertTrue((ci[(group, 'lower')] <= ci[(group, 'value')]).all())
+            self.assertTrue((ci[(group, 'value')] <= ci[(group, 'upper')]).all())
+        self.assertIn(('DELTA', 'upper'), ci.columns)
+
+    def test_seed_makes_threads_deterministic(self):
+        serial = fairness_metrics_bootstrap(self.df, ['sex'], 'prediction', 'reality', n_replicates=1200, seed=8)
+        threaded = fairness_metrics_bootstrap(self.df, ['sex'], 'prediction', 'reality', n_replicates=1200, seed=8, n_jobs=3)
+        pd.testing.assert_frame_equal(serial, threaded)
+
+    def test_needs_replicates(self):
+        with self.assertRaisesRegex(ValueError, 'n_replicates'):
+            fairness_metrics_bootstrap(self.df, ['sex'], 'prediction', 'reality', n_replicates=0)
+
+    def test_last_column_matches_table_with_three_groups(self):
+        rng = np.random.default_rng(11)
+        df = pd.DataFrame({'origin': rng.integers(0, 3, 900), 'prediction': rng.integers(0, 2, 900),
+                           'reality': rng.integers(0, 2, 900)})
+        table = fairness_metrics_table(df, ['origin'], 'prediction', 'reality', aggregate_metrics=True)
+        ci = fairness_metrics_bootstrap(df, ['origin'], 'prediction', 'reality', n_replicates=50, seed=1)
+        rows = ci.index
+        np.testing.assert_allclose(ci[('DELTA', 'value')].values, table.loc[rows, 'DELTA'].values.astype(float))
+        groups = table.loc[rows, ['0', '1', '2']].astype(float)
+        self.assertAlmostEqual(table.loc['DISPARATE IMPACT - PREVALENCE', 'DELTA'],
+                               groups.loc['DISPARATE IMPACT - PREVALENCE'].min() / groups.loc['DISPARATE IMPACT - PREVALENCE'].max())
+
+
+if __name__ == "__main__":
+    unittest.main()
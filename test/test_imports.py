@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import unittest
+import kafkanator
+from kafkanator.benchmarks.import_time import HEAVY_MODULES, measure_import
+
+REPOSITORY = os.path.dirname(os.path.abspath(kafkanator.__file__))
+# coarse ceilings of a cold import, numpy and pandas included, far above the measured values
+MAX_NEW_MODULES = 1000
+MAX_IMPORT_SECONDS = 5.0
+
+
+class LazyImportTest(unittest.TestCase):
+
+    def assert_light(self, report):
+        self.assertEqual(report['loaded'], [])
+        self.assertLess(report['modules'], MAX_NEW_MODULES)
+        self.assertLess(report['seconds'], MAX_IMPORT_SECONDS)
+
+    def test_package_import_is_light(self):
+        self.assert_light(measure_import('kafkanator'))
+
+    def test_inequality_import_is_light(self):
+        self.assert_light(measure_import('kafkanator.inequality'))
+
+    def test_dependencies_load_on_first_use(self):
+        then = "assert abs(kafkanator.inequality.theil_index_T([0.25, 0.25, 0.25, 0.25])) < 1e-12"
+        report = measure_import('kafkanator.inequality', then=then)
+        self.assertNotIn('scipy', report['loaded'])
+        self.assertIn('scipy', report['loaded_after'])
+        self.assertIn('scipy', HEAVY_MODULES)
+
+
+class RepositoryRootTest(unittest.TestCase):
+    """Notebooks and test.py run from the repository root, where kafkanator.py is the 'kafkanator' module."""
+
+    def run_at_root(self, *args):
+        env = dict(os.environ)
+        env.pop('PYTHONPATH', None)
+        return subprocess.run([sys.executable] + list(args), env=env, cwd=REPOSITORY, capture_output=True, text=True)
+
+    def test_notebook_imports(self):
+        code = 'from kafkanator import gini, lorentz_curve\nfrom kafkanator.inequality import gini\nimport kafkanator.util\nprint(gini([1, 1]))'
+        out = self.run_at_root('-c', code)
+        self.assertEqual(out.returncode, 0, out.stderr)
+        self.assertEqual(out.stdout.strip(), '0.0')
+
+    def test_root_test_script(self):
+        out = self.run_at_root('test.py')
+        self.assertEqual(out.returncode, 0, out.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator.inequality import gini, weighted_gini, index_on_dataframe_column, lorentz_curve, weighted_lorentz_curve, index_per_cluster, indexes_per_cluster, robin_hood, theil_index_L, theil_index_T, theil_decomposition
+
+
+def quadratic_gini(x):
+    total = 0
+    for i, xi in enumerate(x[:-1], 1):
+        total += np.sum(np.abs(xi - x[i:]))
+    return total / (len(x)**2 * np.mean(x))
+
+
+class GiniTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+
+    def test_doc_example(self):
+        self.assertAlmostEqual(gini(np.array([1,1,2,2,3,3,3])), 0.20952380952380953)
+
+    def test_matches_quadratic_definition(self):
+        for n in [1, 2, 10, 257]:
+            x = self.rng.integers(1, 10000, n)
+            self.assertAlmostEqual(gini(x), quadratic_gini(np.sort(x)))
+
+    def test_unsorted_input(self):
+        x = self.rng.integers(1, 100, 50)
+        self.assertAlmostEqual(gini(x), gini(np.sort(x)))
+
+    def test_weighted_equals_expanded(self):
+        income = self.rng.integers(1, 500, 40)
+        population = self.rng.integers(1, 20, 40)
+        self.assertAlmostEqual(weighted_gini(income, population), quadratic_gini(np.sort(np.repeat(income, population))))
+
+    def test_dataframe_column(self):
+        df = pd.DataFrame({'salary': [3, 1, 2, 3, 1, 2, 3]})
+        self.assertAlmostEqual(index_on_dataframe_column(df, 'salary', gini), 0.20952380952380953)
+
+
+class LorentzCurveTest(unittest.TestCase):
+
+    def test_lorentz_gini_without_expansion(self):
+        (x, y, g) = lorentz_curve([50, 20, 30, 10], [100, 300, 200, 30], gini_index=True)
+        self.assertAlmostEqual(g, quadratic_gini(np.sort(np.repeat([100, 300, 200, 30], [50, 20, 30, 10]))))
+        np.testing.assert_allclose(x, [0, 10 / 110, 60 / 110, 90 / 110, 1])
+
+    def test_weighted_curve(self):
+        (x, y, g) = weighted_lorentz_curve([2, 1, 1], [10, 40, 20], gini_index=True)
+        np.testing.assert_allclose(x, [0, 0.5, 0.75, 1])
+        np.testing.assert_allclose(y, [0, 20 / 80, 40 / 80, 1])
+        self.assertAlmostEqual(g, gini(np.array([10, 10, 20, 40])))
+
+    def test_downsampled_curve_lays_on_curve(self):
+        rng = np.random.default_rng(2)
+        (population, income) = (rng.integers(1, 10 ** 6, 5000), rng.integers(1, 10 ** 5, 5000))
+        (x, y) = weighted_lorentz_curve(population, income)
+        (xs, ys) = weighted_lorentz_curve(population, income, num_points=11)
+        self.assertEqual(len(xs), 11)
+        np.testing.assert_allclose(ys, np.interp(xs, x, y))
+
+
+class IndexPerClusterTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(21)
+        self.df = pd.DataFrame({'diploma': rng.choice(['C', 'A', 'B'], 500), 'salary': rng.integers(1000, 9000, 500)})
+        self.df.index = rng.permutation(500)
+
+    def test_sorted_keys_and_values(self):
+        result = index_per_cluster(self.df, 'diploma', 'salary', index='robin-hood')
+        self.assertEqual([k for (k, g) in result], ['A', 'B', 'C'])
+        for (k, g) in result:
+            incomes = self.df[self.df['diploma'] == k]['salary'].values
+            self.assertAlmostEqual(g, robin_hood(incomes))
+
+    def test_workers_give_same_result(self):
+        for index in ['gini', 'theil-t', 'theil-l', 'robin-hood']:
+            expected = index_per_cluster(self.df, 'diploma', 'salary', index=index)
+            self.assertEqual(index_per_cluster(self.df, 'diploma', 'salary', index=index, n_jobs=2), expected)
+            self.assertEqual(index_per_cluster(self.df, 'diploma', 'salary', index=index, n_jobs=2, executor='process'), expected)
+
+    def test_theil_l(self):
+        x = np.array([100, 300, 1000, 500])
+        self.assertAlmostEqual(theil_index_L(x), np.mean([np.log(x.mean() / i) for i in x]))
+
+    def test_segmented_indexes_match_per_cluster(self):
+        table = indexes_per_cluster(self.df, 'diploma', 'salary')
+        self.assertEqual(list(table.columns), ['gini', 'theil-t', 'theil-l', 'robin-hood'])
+        for index in table.columns:
+            expected = index_per_cluster(self.df, 'diploma', 'salary', index=index)
+            np.testing.assert_allclose(table[index].values, [g for (k, g) in expected])
+            self.assertEqual(list(table.index), [k for (k, g) in expected])
+
+    def test_unknown_index(self):
+        with self.assertRaises(ValueError):
+            index_per_cluster(self.df, 'diploma', 'salary', index='atkinson')
+
+
+class TheilDecompositionTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(9)
+        n = 4000
+        self.df = pd.DataFrame({'region': rng.choice(['n', 's', 'e', 'w'], n), 'salary': rng.integers(800, 9000, n)})
+        self.df.loc[self.df['region'] == 'n', 'salary'] *= 3
+
+    def test_parts_add_up_to_the_total(self):
+        (summary, groups) = theil_decomposition(self.df, 'region', 'salary')
+        x = self.df['salary'].values
+        self.assertAlmostEqual(summary.loc['theil-t', 'total'], theil_index_T(x, array_type='gains'))
+        self.assertAlmostEqual(summary.loc['theil-l', 'total'], theil_index_L(x))
+        np.testing.assert_allclose(summary['between'] + summary['within'], summary['total'])
+        self.assertEqual(list(groups.index), ['e', 'n', 's', 'w'])
+        for (region, incomes) in self.df.groupby('region')['salary']:
+            self.assertAlmostEqual(groups.loc[region, 'theil-l'], theil_index_L(incomes.values))
+            self.assertAlmostEqual(groups.loc[region, 'theil-t'], theil_index_T(incomes.values, array_type='gains'))
+
+    def test_no_between_inequality_with_equal_means(self):
+        df = pd.DataFrame({'g': ['a', 'a', 'b', 'b'], 'x': [1, 3, 3, 1]})
+        (summary, _) = theil_decomposition(df, 'g', 'x')
+        np.testing.assert_allclose(summary['between'], [0, 0], atol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+from kafkanator.inequality import gini, robin_hood, theil_index_L, theil_index_T
+from kafkanator.inference import leave_one_out, jackknife_se, inequality_inference
+
+
+class InferenceTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(17)
+        self.x = rng.integers(800, 9000, 150)
+
+    def test_leave_one_out_closed_forms(self):
+        xs = np.sort(self.x)
+        for (index, function) in [('gini', gini), ('theil-t', theil_index_T), ('theil-l', theil_index_L), ('robin-hood', robin_hood)]:
+            expected = [function(np.delete(xs, k)) for k in range(len(xs))]
+            np.testing.assert_allclose(leave_one_out(self.x, index), expected)
+
+    def test_inference_table(self):
+        table = inequality_inference(self.x, n_replicates=1500, seed=4)
+        self.assertEqual(list(table.index), ['gini', 'theil-t', 'theil-l', 'robin-hood'])
+        self.assertAlmostEqual(table.loc['gini', 'estimate'], gini(self.x))
+        self.assertAlmostEqual(table.loc['gini', 'jackknife_se'], jackknife_se(self.x, 'gini'))
+        self.assertTrue((table['lower'] < table['estimate']).all() and (table['estimate'] < table['upper']).all())
+        # both error estimates agree on a sample of this size
+        np.testing.assert_allclose(table['bootstrap_se'], table['jackknife_se'], rtol=0.25)
+
+    def test_seeded_workers(self):
+        serial = inequality_inference(self.x, n_replicates=300, seed=2)
+        threaded = inequality_inference(self.x, n_replicates=300, seed=2, n_jobs=2)
+        np.testing.assert_array_equal(serial.values, threaded.values)
+
+
+if __name__ == "__main__":
+    unittest.main()
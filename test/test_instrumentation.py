@@ -0,0 +1,47 @@
+import contextlib
+import io
+import json
+import logging
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator import Profile
+from kafkanator.inequality import index_per_cluster, lorentz_curve
+from kafkanator.fairness.metrics import fairness_metrics_table
+
+
+class ProfileTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.df = pd.DataFrame({'sex': rng.choice(['F', 'M'], size=200), 'prediction': rng.integers(0, 2, size=200),
+                                'reality': rng.integers(0, 2, size=200), 'income': rng.integers(1, 1000, size=200)})
+
+    def test_spans_and_counters(self):
+        with Profile() as profile:
+            fairness_metrics_table(self.df, ['sex'], 'prediction', 'reality', aggregate_metrics=True)
+            index_per_cluster(self.df, 'sex', 'income')
+            lorentz_curve([50, 20, 30], [100, 300, 200], gini_index=True)
+        stages = [span['stage'] for span in profile.spans]
+        self.assertEqual(stages, ['fairness_metrics_table.counts', 'fairness_metrics_table.table', 'index_per_cluster.sort',
+                                  'index_per_cluster.indexes', 'lorentz_curve.curve', 'lorentz_curve.gini'])
+        self.assertEqual(profile.spans[0]['rows'], 200)
+        self.assertEqual(profile.spans[0]['groups'], 2)
+        self.assertEqual(profile.spans[2]['clusters'], 2)
+        self.assertTrue(all(span['seconds'] >= 0 for span in profile.spans))
+        self.assertEqual(len(json.loads(profile.to_json())), 6)
+        self.assertEqual(profile.summary().loc['lorentz_curve.gini', 'calls'], 1)
+
+    def test_silent_and_off_by_default(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            with Profile() as profile:
+                fairness_metrics_table(self.df, ['sex'], 'prediction', 'reality', aggregate_metrics=True)
+            fairness_metrics_table(self.df, ['sex'], 'prediction', 'reality', aggregate_metrics=True)
+        self.assertEqual(output.getvalue(), '')
+        self.assertEqual(len(profile.spans), 2)
+        self.assertFalse(logging.getLogger('kafkanator').isEnabledFor(logging.DEBUG))
+
+
+if __name__ == '__main__':
+    unittest.main()
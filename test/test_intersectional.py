@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.intersectional import intersectional_metrics
+
+
+class IntersectionalTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(13)
+        n = 3000
+        self.df = pd.DataFrame({'race': rng.choice(['a', 'b', 'c'], n), 'sex': rng.choice(['F', 'M'], n),
+                                'band': rng.integers(0, 4, n), 'prediction': rng.integers(0, 2, n),
+                                'reality': rng.integers(0, 2, n)})
+
+    def check_row(self, row, attributes):
+        mask = np.ones(len(self.df), dtype=bool)
+        for a in attributes:
+            mask &= (self.df[a] == row[a]).values
+        sub = self.df[mask]
+        self.assertEqual(row['n'], len(sub))
+        self.assertAlmostEqual(row['DEMOGRAPHIC PARITY - P1'], sub['prediction'].mean())
+        self.assertAlmostEqual(row['EQUAL OPPORTUNITY - TPR'], sub[sub['reality'] == 1]['prediction'].mean())
+
+    def test_full_intersection(self):
+        table = intersectional_metrics(self.df, ['race', 'sex', 'band'], 'prediction', 'reality')
+        self.assertEqual(len(table), 24)
+        for (_, row) in table.iterrows():
+            self.check_row(row, ['race', 'sex', 'band'])
+
+    def test_subsets_and_support(self):
+        table = intersectional_metrics(self.df, ['race', 'sex', 'band'], 'prediction', 'reality', subsets=True, min_support=200)
+        # race x sex x band cells hold about 125 rows, so the whole level is pruned
+        self.assertEqual(set(table['level']), {'race,sex', 'race,band', 'sex,band', 'race', 'sex', 'band'})
+        self.assertTrue((table['n'] >= 200).all())
+        for (_, row) in table.iterrows():
+            self.check_row(row, row['level'].split(','))
+
+
+if __name__ == "__main__":
+    unittest.main()
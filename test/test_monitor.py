@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.metrics import fairness_metrics_table
+from kafkanator.fairness.monitor import FairnessMonitor
+
+
+class FairnessMonitorTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(9)
+        self.batches = [pd.DataFrame({'sex': rng.integers(0, 2, 200), 'prediction': rng.integers(0, 2, 200),
+                                      'reality': rng.integers(0, 2, 200)}) for _ in range(6)]
+
+    def expected(self, batches):
+        return fairness_metrics_table(pd.concat(batches, ignore_index=True), ['sex'], 'prediction', 'reality', aggregate_metrics=True)
+
+    def table(self, monitor):
+        return monitor.table(aggregate_metrics=True)
+
+    def feed(self, monitor, batches):
+        for (t, b) in enumerate(batches):
+            monitor.update(b['sex'], b['prediction'], b['reality'], timestamp=t)
+        return monitor
+
+    def test_cumulative(self):
+        monitor = self.feed(FairnessMonitor(), self.batches)
+        pd.testing.assert_frame_equal(self.table(monitor), self.expected(self.batches))
+
+    def test_sliding_window(self):
+        monitor = self.feed(FairnessMonitor(window=4), self.batches)
+        pd.testing.assert_frame_equal(self.table(monitor), self.expected(self.batches[2:]))
+
+    def test_tumbling_window(self):
+        monitor = self.feed(FairnessMonitor(window=4, mode='tumbling'), self.batches)
+        pd.testing.assert_frame_equal(self.table(monitor), self.expected(self.batches[4:]))
+
+    def test_evict_before(self):
+        monitor = self.feed(FairnessMonitor(), self.batches).evict_before(3)
+        pd.testing.assert_frame_equal(self.table(monitor), self.expected(self.batches[3:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
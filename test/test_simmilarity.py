@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.simmilarity import simmilarity_fairness_hash, simmilarity_fairness_pairs, simmilarity_fairness_neighbors, categorical_simmilarity_distance
+
+
+class SimmilarityHashTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        n = 120
+        self.data = pd.DataFrame({'sex': rng.choice(['F', 'M'], n), 'race': rng.choice(['a', 'b', 'c'], n),
+                                  'age': rng.integers(18, 60, n), 'priors': rng.integers(0, 4, n),
+                                  'prediction': rng.integers(0, 2, n)})
+        self.spec = {'race': 'cat', 'age': 'num', 'priors': 'num', 'prediction': 'target'}
+
+    def row_wise(self, numrows):
+        wo = self.data[self.data['sex'] == 'F'].reset_index(drop=True).iloc[0:numrows]
+        ma = self.data[self.data['sex'] == 'M'].reset_index(drop=True).iloc[0:numrows]
+        hDict = {}
+        for i, w in wo.iterrows():
+            for j, h in ma.iterrows():
+                reto = categorical_simmilarity_distance(w, h, self.spec)
+                hDict[(i, j)] = (sum(reto[0].values()), reto[1])
+        return sorted(hDict.items(), key=lambda row: row[1][0])
+
+    def test_same_result_as_row_wise_distance(self):
+        expected = self.row_wise(30)
+        for block_size in [None, 1, 7]:
+            self.assertEqual(simmilarity_fairness_hash(self.data, 'sex', ['F', 'M'], self.spec, 30, block_size=block_size), expected)
+
+    def add_nulls(self):
+        # None == None is True and nan == nan is False on the row wise distance
+        race = self.data['race'].astype(object)
+        race.iloc[0::7] = None
+        race.iloc[3::11] = np.nan
+        prediction = self.data['prediction'].astype(object)
+        prediction.iloc[5::9] = None
+        self.data['race'], self.data['prediction'] = race, prediction
+
+    def test_nulls_as_row_wise_distance(self):
+        self.add_nulls()
+        self.assertEqual(simmilarity_fairness_hash(self.data, 'sex', ['F', 'M'], self.spec, 30, block_size=7), self.row_wise(30))
+
+    def test_every_row(self):
+        result = simmilarity_fairness_hash(self.data, 'sex', ['F', 'M'], self.spec)
+        self.assertEqual(len(result), (self.data['sex'] == 'F').sum() * (self.data['sex'] == 'M').sum())
+
+    def test_query_mode_matches_filtered_hash(self):
+        full = simmilarity_fairness_hash(self.data, 'sex', ['F', 'M'], self.spec)
+        expected = [(x, y) for (x, y) in full if y[1] == False and y[0] <= 5]
+        result = simmilarity_fairness_pairs(self.data, 'sex', ['F', 'M'], self.spec, max_distance=5, different_treatment=True, block_size=9)
+        self.assertEqual(result, expected)
+
+    def test_top_k(self):
+        full = simmilarity_fairness_hash(self.data, 'sex', ['F', 'M'], self.spec)
+        same_treatment = [(x, y) for (x, y) in full if y[1] == True]
+        for top_k in [1, 25, 10 ** 6]:
+            result = simmilarity_fairness_pairs(self.data, 'sex', ['F', 'M'], self.spec, top_k=top_k, different_treatment=False, block_size=4)
+            self.assertEqual(result, same_treatment[0:top_k])
+
+    def test_radius_neighbors_match_threshold_pairs(self):
+        expected = simmilarity_fairness_pairs(self.data, 'sex', ['F', 'M'], self.spec, max_distance=6, different_treatment=True)
+        result = simmilarity_fairness_neighbors(self.data, 'sex', ['F', 'M'], self.spec, radius=6, different_treatment=True)
+        self.assertEqual(result, expected)
+
+    def test_neighbors_with_nulls(self):
+        self.add_nulls()
+        expected = simmilarity_fairness_pairs(self.data, 'sex', ['F', 'M'], self.spec, max_distance=6, different_treatment=False)
+        result = simmilarity_fairness_neighbors(self.data, 'sex', ['F', 'M'], self.spec, radius=6, different_treatment=False)
+        self.assertEqual(result, expected)
+
+    def test_knn_neighbors(self):
+        full = simmilarity_fairness_hash(self.data, 'sex', ['F', 'M'], self.spec)
+        result = simmilarity_fairness_neighbors(self.data, 'sex', ['F', 'M'], self.spec, k=3)
+        for i in {x[0] for (x, y) in full}:
+            row = sorted([(y[0], x[1]) for (x, y) in full if x[0] == i])[0:3]
+            self.assertEqual(sorted([(y[0], x[1]) for (x, y) in result if x[0] == i]), row)
+
+
+if __name__ == "__main__":
+    unittest.main()
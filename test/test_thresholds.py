@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator.fairness.confusion import group_confusion_counts
+from kafkanator.fairness.thresholds import threshold_curves, GAP_COLUMNS
+
+
+class ThresholdCurvesTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(21)
+        n = 2000
+        reality = rng.integers(0, 2, n)
+        self.df = pd.DataFrame({'race': rng.choice(['a', 'b', 'c'], n), 'reality': reality,
+                                'score': np.round(0.4 * reality + 0.6 * rng.random(n), 2)})
+        self.df.loc[5, 'score'] = np.nan
+
+    def test_matches_hard_predictions(self):
+        thresholds = [0.0, 0.25, 0.5, 0.51, 0.75, 1.5]
+        (curves, gaps) = threshold_curves(self.df, 'race', 'score', 'reality', thresholds=thresholds)
+        self.assertEqual(len(curves), len(thresholds) * 3)
+        scored = self.df[self.df['score'].notna()]
+        for t in thresholds:
+            hard = scored.assign(prediction=(scored['score'] >= t).astype(int))
+            expected = group_confusion_counts(hard, 'race', 'prediction', 'reality')
+            rows = curves[curves['threshold'] == t]
+            self.assertEqual(rows['group'].tolist(), expected.keys)
+            np.testing.assert_array_equal(rows['tp'].values, expected.tp)
+            np.testing.assert_array_equal(rows['fp'].values, expected.fp)
+            np.testing.assert_array_equal(rows['tn'].values, expected.tn)
+            np.testing.assert_array_equal(rows['fn'].values, expected.fn)
+            tpr = expected.tpr()
+            self.assertAlmostEqual(gaps.loc[t, GAP_COLUMNS[1]], np.max(tpr) - np.min(tpr))
+
+    def test_default_sweep(self):
+        (curves, gaps) = threshold_curves(self.df, ['race'], 'score', 'reality', thresholds=11)
+        self.assertEqual(len(gaps), 11)
+        self.assertEqual(gaps.index[0], self.df['score'].min())
+        # everybody is predicted positive at the lowest score
+        self.assertTrue((curves[curves['threshold'] == gaps.index[0]]['positive_rate'] == 1).all())
+        self.assertTrue((gaps[GAP_COLUMNS[4]] >= gaps[GAP_COLUMNS[1]]).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+import pandas as pd
+from kafkanator.util import categorize_interval, interval_categories, validate_intervals, rename_column, recode_columns, recode_values
+
+
+class CategorizeIntervalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ages = { 'young':(20,30) , 'adult':(31,50), 'elder':(51,70) }
+        self.df = pd.DataFrame({'age': [20, 30.9, 31, 50, 70, 71, 19, np.nan, 45]})
+
+    def test_labels(self):
+        result = categorize_interval(self.df, 'age', self.ages)
+        self.assertEqual(result.tolist()[0:5], ['young', 'young', 'adult', 'adult', 'elder'])
+        self.assertTrue(result.iloc[5:8].isna().all())
+        self.assertEqual(result.dtype, object)
+        self.assertIsNone(result.iloc[5])
+
+    def test_categorical_out_of_range_label(self):
+        result = categorize_interval(self.df, 'age', self.ages, categorical=True, out_of_range='unknown')
+        self.assertEqual(result.dtype, 'category')
+        self.assertEqual(list(result.cat.categories), ['young', 'adult', 'elder', 'unknown'])
+        self.assertEqual(result.tolist()[5:7], ['unknown', 'unknown'])
+        self.assertTrue(pd.isna(result.iloc[7]))
+
+    def test_out_of_range_existing_label(self):
+        result = interval_categories(self.df['age'], self.ages, out_of_range='elder')
+        self.assertEqual(list(result.categories), ['young', 'adult', 'elder'])
+        self.assertEqual(list(result[5:7]), ['elder', 'elder'])
+
+    def test_out_of_range_raise(self):
+        with self.assertRaises(ValueError):
+            interval_categories(self.df['age'], self.ages, out_of_range='raise')
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            validate_intervals({'a': (0, 10), 'b': (10, 20)})
+        with self.assertRaises(ValueError):
+            validate_intervals({'a': (0, 10), 'b': (12, 20)}, allow_gaps=False)
+        self.assertEqual(validate_intervals({'b': (11, 20), 'a': (0, 10)}, allow_gaps=False)[0], ['a', 'b'])
+
+
+class RecodeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'sex': ['M', 'F', 'F', 'X', 'M'], 'race': [0, 1, 2, 1, 0]})
+
+    def test_rename_column(self):
+        self.assertEqual(rename_column(self.df, 'race', {0: 'a', 1: 'b', 2: 'a'}).tolist(), ['a', 'b', 'a', 'b', 'a'])
+        with self.assertRaises(KeyError):
+            rename_column(self.df, 'sex', {'M': 'Male', 'F': 'Female'})
+
+    def test_recode_columns_report(self):
+        (recoded, reports) = recode_columns(self.df, {'sex': {'M': 'Male', 'F': 'Female'}, 'race': {0: 'white'}}, unmapped='null')
+        self.assertEqual(recoded['sex'].dtype, 'category')
+        self.assertEqual(recoded['sex'].tolist()[0:3], ['Male', 'Female', 'Female'])
+        self.assertTrue(pd.isna(recoded['sex'].iloc[3]))
+        self.assertEqual(reports['sex']['unmapped'], {'X': 1})
+        self.assertEqual(reports['race']['unmapped'], {1: 2, 2: 1})
+        (kept, reports) = recode_columns(self.df, {'sex': {'M': 'Male'}}, unmapped='keep')
+        self.assertEqual(kept['sex'].tolist(), ['Male', 'F', 'F', 'X', 'Male'])
+
+    def test_recode_null_values(self):
+        values = ['M', None, 'F', np.nan]
+        with self.assertRaises(KeyError):
+            recode_values(values, {'M': 'Male', 'F': 'Female'})
+        (recoded, report) = recode_values(values, {'M': 'Male', 'F': 'Female', np.nan: 'Unknown'})
+        self.assertEqual(list(recoded), ['Male', 'Unknown', 'Female', 'Unknown'])
+        self.assertEqual(report['unmapped'], {})
+        (recoded, report) = recode_values(values, {'M': 'Male'}, unmapped='null')
+        self.assertEqual(list(recoded[0:1]), ['Male'])
+        self.assertTrue(pd.isna(recoded[1:]).all())
+        self.assertEqual(sorted(report['unmapped'].values()), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,26 +1,147 @@
+import logging
 import numpy as np
-def categorize_interval(df, column, diction ):
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def validate_intervals(diction, allow_gaps=True):
+    """This method checks the closed integer intervals of a categorize_interval(..) mapping and sorts them.
+
+    Args:
+        diction (dict): A dictionary containing the number - category mapping, for example { 'young':(20,30) , 'adult':(31,50), 'elder':(51,70) }.
+        allow_gaps (boolean): False to raise an error when some integer between two intervals belongs to no interval (i.e. (20,30) and (35,50)).
+
+    Returns:
+        tuple : (labels, lows, highs) sorted by interval lower bound.
+    """
+    items = sorted(diction.items(), key=lambda kv: kv[1][0])
+    labels = [k for (k,v) in items]
+    lows = np.array([v[0] for (k,v) in items], dtype=np.float64)
+    highs = np.array([v[1] for (k,v) in items], dtype=np.float64)
+    for i in range(len(items)):
+        if lows[i] > highs[i]:
+            raise ValueError('interval ' + str(labels[i]) + ' has its lower bound above its upper bound')
+        if i > 0 and lows[i] <= highs[i-1]:
+            raise ValueError('intervals ' + str(labels[i-1]) + ' and ' + str(labels[i]) + ' overlap')
+        if i > 0 and not allow_gaps and lows[i] > highs[i-1] + 1:
+            raise ValueError('gap between intervals ' + str(labels[i-1]) + ' and ' + str(labels[i]))
+    return labels, lows, highs
+
+def interval_categories(values, diction, out_of_range=None, allow_gaps=True):
+    """This method turns integer values into interval labels with a single sorted edges searchsorted pass.
+
+    Values are truncated to integers first, like int(x), and matched against the closed intervals of diction.
+
+    Args:
+        values (array like): the numbers to categorize.
+        diction (dict): A dictionary containing the number - category mapping, see validate_intervals(..). Intervals must not overlap.
+        out_of_range (str, optional): what to do with values outside every interval: None leaves them null, 'raise' raises a ValueError
+        and any other value is used as the label of an extra category, or joins the interval of that label when diction
+        already has it. Null values stay null.
+        allow_gaps (boolean): see validate_intervals(..).
+
+    Returns:
+        pandas Categorical : ordered categorical whose categories follow the interval order.
+    """
+    labels, lows, highs = validate_intervals(diction, allow_gaps)
+    x = np.trunc(np.asarray(values, dtype=np.float64))
+    pos = np.searchsorted(lows, x, side='right') - 1
+    inside = (pos >= 0) & (x <= highs[np.maximum(pos, 0)])
+    codes = np.where(inside, pos, -1)
+    outside = ~inside & ~np.isnan(x)
+    if outside.any():
+        if out_of_range == 'raise':
+            raise ValueError(str(outside.sum()) + ' values fall outside every interval, first one is ' + str(x[outside][0]))
+        elif out_of_range in labels:
+            codes[outside] = labels.index(out_of_range)
+        elif out_of_range is not None:
+            labels = labels + [out_of_range]
+            codes[outside] = len(labels) - 1
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+def categorize_interval(df, column, diction, categorical=False, out_of_range=None ):
     """This method applies a function on a pandas data frame column, the goal is to replace integer intervals by a categorical values.
 
     Args:
         df (pandas DataFrame): dataframe .
         column (str): The column on we will apply the number to category transformation.
         diction (str):  A dictionary containing the number - category mapping. For example if we want to convert age intervals to human readable : { 'young':(20,30) , 'adult':(31,50), 'elder':(51,70) }
+        categorical (boolean): True to get a memory efficient category column, False to get python labels (None when no interval matches).
+        out_of_range (str, optional): handling of values outside every interval, see interval_categories(..).
     
     Returns:
         DataFrame : a dataframe with numerical column 'column' transformed into a categorical one according to diction mapping.
     """
     # dictio = { 'young':[20,30] , 'adult':[31,50], 'elder':[51,70]  }
-    def interval_function(x,dictio):
-        for (k,v) in dictio.items():
-            if v[0] <= int(x) and int(x) <= v[1] :
-                return k
-    return df[column].apply(lambda x: interval_function(x,diction))
+    categories = pd.Series(interval_categories(df[column].values, diction, out_of_range), index=df.index, name=column)
+    if categorical:
+        return categories
+    return categories.astype(object).where(categories.notna(), None)
+
+def recode_values(values, mapping, unmapped='raise'):
+    """This method recodes a column through a dictionary working on its distinct values only: the column is factorized once,
+    the mapping is applied to the unique values and the result is rebuilt from the codes.
+
+    Args:
+        values (array like): the values to recode.
+        mapping (dict): old value -> new value.
+        unmapped (str): what to do with values missing from mapping: 'raise' raises a KeyError (like diction[x]), 'keep' keeps the
+        original value, 'null' leaves a null value. Null values (None, nan) are recoded like any other value: a None or nan
+        key of mapping recodes all of them, otherwise they are unmapped, so 'raise' raises on a null value too.
+
+    Returns:
+        tuple : (pandas Categorical, report), report is a dictionary {'unmapped': {value: number of rows}, 'handling': unmapped}.
+    """
+    if unmapped not in ('raise', 'keep', 'null'):
+        raise ValueError('unmapped must be raise, keep or null')
+    # nulls get a code of their own, nan != nan so they are looked up through the null key of mapping if any
+    codes, uniques = pd.factorize(values if isinstance(values, pd.Series) else pd.Series(values, dtype=object), use_na_sentinel=False)
+    uniques = list(uniques)
+    null_keys = [k for k in mapping if pd.api.types.is_scalar(k) and pd.isna(k)]
+    keys = [null_keys[0] if len(null_keys) > 0 and pd.api.types.is_scalar(u) and pd.isna(u) else u for u in uniques]
+    missing = [i for (i, k) in enumerate(keys) if k not in mapping]
+    if len(missing) > 0 and unmapped == 'raise':
+        raise KeyError(uniques[missing[0]])
+    rows_per_unique = np.bincount(codes, minlength=len(uniques))
+    report = {'unmapped': {uniques[i]: int(rows_per_unique[i]) for i in missing}, 'handling': unmapped}
+    new_values = [mapping[k] if k in mapping else (u if unmapped == 'keep' else None) for (u, k) in zip(uniques, keys)]
+    # several old values can map to the same new one, so the new values are factorized again
+    new_codes, categories = pd.factorize(pd.Series(new_values, dtype=object))
+    return pd.Categorical.from_codes(new_codes[codes], categories=categories), report
+
+def recode_columns(df, mappings, unmapped='raise'):
+    """This method recodes several columns of a dataframe, for example sensitive attributes before an audit, see recode_values(..).
 
-def rename_column ( df, column , dictionn ):
-    def rename_function(x,diction):
-        return diction[x]
-    return df[column].apply(lambda x : rename_function(x,dictionn))
+    Args:
+        df (pandas DataFrame): dataframe .
+        mappings (dict): column -> {old value: new value} dictionary.
+        unmapped (str): 'raise', 'keep' or 'null', see recode_values(..).
+
+    Returns:
+        tuple : (DataFrame, reports), a copy of df whose recoded columns are categorical, and a {column: report} dictionary.
+    """
+    recoded = df.copy()
+    reports = {}
+    for (column, mapping) in mappings.items():
+        (categories, reports[column]) = recode_values(df[column], mapping, unmapped)
+        recoded[column] = pd.Series(categories, index=df.index)
+    return recoded, reports
+
+def rename_column ( df, column , dictionn, categorical=False ):
+    """This method maps the values of a column through a dictionary, a KeyError is raised on values missing from the dictionary.
+
+    Args:
+        df (pandas DataFrame): dataframe .
+        column (str): The column to rename values of.
+        dictionn (dict): old value -> new value.
+        categorical (boolean): True to get a category column instead of python values.
+
+    Returns:
+        Series : the renamed column.
+    """
+    (categories, report) = recode_values(df[column], dictionn)
+    renamed = pd.Series(categories, index=df.index, name=column)
+    return renamed if categorical else renamed.astype(object).infer_objects()
 
 
 def transform_dict_keys_to_str(sp):
@@ -58,7 +179,6 @@ def default_row_highlighting(s):
     if 'PREVALENCE' in inde :
         return compareRatio(d,s)
     else:
-        print ( 'd is ', str(d))
+        logger.debug('row %s gap is %s', s.name, d)
         if type(d) == float or isinstance(d,np.floating ):
-            print ( ' in if')
             return compareSubstraction(d,s)
\ No newline at end of file